@@ -10,8 +10,6 @@ import numpy as np
 import warnings
 
 from opensoundscape.utils import (
-    overlap,
-    overlap_fraction,
     generate_clip_times_df,
     make_clip_df,
     GetDurationError,
@@ -111,6 +109,7 @@ class BoxedAnnotations:
         annotation_column_name=None,
         keep_extra_columns=True,
         column_mapping_dict=None,
+        num_workers=1,
     ):
         """load annotations from Raven .txt files
 
@@ -151,13 +150,15 @@ class BoxedAnnotations:
                         "High Freq (Hz)": "high_f",
                     }
                 This dictionary will be updated with any user-specified mappings.
+            num_workers: number of threads used to read and parse Raven files
+                in parallel [default: 1]. -1 uses all cores. Reading many small
+                files is dominated by file I/O and parsing, which overlap well
+                across threads.
 
         Returns:
             BoxedAnnotations object containing annotations from the Raven files
             (the .df attribute is a dataframe containing each annotation)
         """
-        all_file_dfs = []
-
         # mapping of Raven file columns to standard opensoundscape names
         # key: Raven file; value: opensoundscape name
         column_mapping_dict = {
@@ -176,7 +177,8 @@ class BoxedAnnotations:
             `audio_files` and `raven_files` lists must have one-to-one correspondence,
             but their lengths did not match.
             """
-        for i, raven_file in enumerate(raven_files):
+
+        def load_raven_file(raven_file, audio_file):
             df = pd.read_csv(raven_file, delimiter="\t")
             if annotation_column_name is not None:
                 # annotation_column_name argument takes precedence over
@@ -245,12 +247,26 @@ class BoxedAnnotations:
                 pass
 
             # add audio file column
-            if audio_files is not None:
-                df["audio_file"] = audio_files[i]
-            else:
-                df["audio_file"] = np.nan
+            df["audio_file"] = audio_file
 
-            all_file_dfs.append(df)
+            return df
+
+        if audio_files is None:
+            audio_files_ = [np.nan] * len(raven_files)
+        else:
+            audio_files_ = audio_files
+        if num_workers == 1:
+            all_file_dfs = [
+                load_raven_file(raven_file, audio_file)
+                for raven_file, audio_file in zip(raven_files, audio_files_)
+            ]
+        else:
+            from joblib import Parallel, delayed
+
+            all_file_dfs = Parallel(n_jobs=num_workers, prefer="threads")(
+                delayed(load_raven_file)(raven_file, audio_file)
+                for raven_file, audio_file in zip(raven_files, audio_files_)
+            )
 
         # we drop the original index from the Raven annotations when we combine tables
         # if the dataframes have different columns, we fill missing columns with nan values
@@ -339,6 +355,10 @@ class BoxedAnnotations:
                 """
             )
 
+        # find the rows of each file in a single pass over df,
+        # rather than comparing every row to every file
+        file_rows = df.groupby("audio_file", sort=False).indices
+
         # save each file's annotations to a separate raven-formatted txt file
         for file in unique_files:
             # for NaN values of file, call the output file "unspecified_audio.selections.txt"
@@ -347,7 +367,7 @@ class BoxedAnnotations:
                 fname = "unspecified_audio.selections.txt"
             else:
                 # subset to annotations for this file
-                file_df = df[df["audio_file"] == file]
+                file_df = df.iloc[file_rows.get(file, [])]
                 fname = f"{Path(file).stem}.selections.txt"
             file_df.to_csv(f"{save_dir}/{fname}", sep="\t", index=False)
 
@@ -380,7 +400,7 @@ class BoxedAnnotations:
             new BoxedAnnotations object containing only annotations in `classes`
         """
         df = self.df.copy()  # avoid modifying df of original object
-        df = df[df["annotation"].apply(lambda x: x in classes)]
+        df = df[df["annotation"].isin(classes)]
         # keep the same lists of annotation_files and audio_files
         return self._spawn(df=df)
 
@@ -425,25 +445,17 @@ class BoxedAnnotations:
 
         df = self.df.copy()  # avoid modifying df of original object
 
-        # select annotations that overlap with window
-        def in_bounds(t0, t1):
-            """check if annotation from t0 to t1 falls within
-            the range [start_range,end_range)
+        assert np.all(df["start_time"] <= df["end_time"])
 
-            inclusive on left, exclusive on right
-            """
-            assert t0 <= t1
-            ends_before_bounds = t1 < start_time
-            starts_after_bounds = t0 >= end_time
-            return not (ends_before_bounds or starts_after_bounds)
-
-        df = df.loc[
-            [in_bounds(t0, t1) for t0, t1 in zip(df["start_time"], df["end_time"])], :
-        ]
+        # select annotations that overlap with window [start_time, end_time)
+        # (inclusive on left, exclusive on right)
+        ends_before_bounds = df["end_time"] < start_time
+        starts_after_bounds = df["start_time"] >= end_time
+        df = df[~(ends_before_bounds | starts_after_bounds)]
 
         if edge_mode == "trim":  # trim boxes to start and end times
-            df["start_time"] = [max(start_time, x) for x in df["start_time"]]
-            df["end_time"] = [min(end_time, x) for x in df["end_time"]]
+            df["start_time"] = np.maximum(start_time, df["start_time"])
+            df["end_time"] = np.minimum(end_time, df["end_time"])
         elif edge_mode == "remove":  # remove boxes that extend beyond edges
             df = df[df["start_time"] >= start_time]
             df = df[df["end_time"] <= end_time]
@@ -485,19 +497,16 @@ class BoxedAnnotations:
 
         df = self.df.copy()
 
+        assert np.all(df["low_f"] <= df["high_f"])
+
         # remove annotations that don't overlap with bandpass range
-        df = df.loc[
-            [
-                overlap([low_f, high_f], [f0, f1]) > 0
-                for f0, f1 in zip(df["low_f"], df["high_f"])
-            ],
-            :,
-        ]
+        overlaps = np.minimum(high_f, df["high_f"]) - np.maximum(low_f, df["low_f"])
+        df = df[overlaps > 0]
 
         # handle edges
         if edge_mode == "trim":  # trim boxes to start and end times
-            df["low_f"] = [max(low_f, x) for x in df["low_f"]]
-            df["high_f"] = [min(high_f, x) for x in df["high_f"]]
+            df["low_f"] = np.maximum(low_f, df["low_f"])
+            df["high_f"] = np.minimum(high_f, df["high_f"])
         elif edge_mode == "remove":  # remove boxes that extend beyond edges
             df = df[df["low_f"] >= low_f]
             df = df[df["high_f"] <= high_f]
@@ -509,9 +518,11 @@ class BoxedAnnotations:
     def unique_labels(self):
         """get list of all unique labels
 
-        ignores null/Falsy labels by performing .df.dropna()
+        ignores null/Falsy labels by dropping nan values from the annotation column
         """
-        return self.df.dropna(subset=["annotation"])["annotation"].unique()
+        # drop nans from the annotation column only, rather than
+        # copying every column of the dataframe
+        return self.df["annotation"].dropna().unique()
 
     def global_one_hot_labels(self, classes):
         """get a list of one-hot labels for entire set of annotations
@@ -521,7 +532,7 @@ class BoxedAnnotations:
         Returns:
             list of 0/1 labels for each class
         """
-        all_labels = self.unique_labels()
+        all_labels = set(self.unique_labels())  # hashed lookup for each class
         return [int(c in all_labels) for c in classes]
 
     def one_hot_labels_like(
@@ -586,12 +597,22 @@ class BoxedAnnotations:
             df = df[df["annotation"].isin(classes)]
 
         # the clip_df should have ['file','start_time','end_time'] as the index
-        clip_df[classes] = float("nan")  # add columns for each class
-
-        for file, start, end in clip_df.index:
-            if not file == file:  # file is NaN, get corresponding rows
+        # fill an array with one row of labels per clip, and write it to
+        # clip_df once at the end rather than assigning to clip_df row by row
+        labels = np.zeros((len(clip_df), len(classes)))
+        clip_starts = clip_df.index.get_level_values(1).to_numpy(dtype=float)
+        clip_ends = clip_df.index.get_level_values(2).to_numpy(dtype=float)
+
+        # label all clips of each file at once
+        # (factorize gives NaN files the code -1 in all supported pandas versions)
+        file_codes, files = pd.factorize(clip_df.index.get_level_values(0))
+        clip_positions = pd.Series(range(len(clip_df))).groupby(file_codes).indices
+        for code in pd.unique(file_codes):
+            if code == -1:  # file is NaN, get corresponding rows
+                file = np.nan
                 file_df = df[df["audio_file"].isnull()]
             else:  # subset annotations to this file
+                file = files[code]
                 file_df = df[df["audio_file"] == file]
 
             # warn user if no annotations correspond to this file
@@ -601,16 +622,18 @@ class BoxedAnnotations:
                     "clip labels will be zero for this file."
                 )
 
-            # add clip labels for this row of clip dataframe
-            clip_df.loc[(file, start, end), :] = one_hot_labels_on_time_interval(
+            # add clip labels for the rows of clip dataframe from this file
+            idx = clip_positions[code]
+            labels[idx] = _one_hot_labels_on_time_intervals(
                 file_df,
-                start_time=start,
-                end_time=end,
+                start_times=clip_starts[idx],
+                end_times=clip_ends[idx],
                 min_label_overlap=min_label_overlap,
                 min_label_fraction=min_label_fraction,
                 class_subset=classes,
             )
 
+        clip_df[list(classes)] = labels  # add columns for each class
         return clip_df
 
     def one_hot_clip_labels(
@@ -714,11 +737,19 @@ class BoxedAnnotations:
                 clip_overlap=clip_overlap,
                 final_clip=final_clip,
             )
-            # make a clip df for all files
-            clip_df = pd.concat([clip_df_template] * len(audio_files))
-            # add file column, repeating value of file across each clip
-            clip_df["file"] = np.repeat(audio_files, len(clip_df_template))
-            clip_df = clip_df.set_index(["file", "start_time", "end_time"])
+            # make a clip df for all files, building its index in one step:
+            # repeat each file across its clips, and tile the clip times
+            n_clips = len(clip_df_template)
+            clip_df = pd.DataFrame(
+                index=pd.MultiIndex.from_arrays(
+                    [
+                        np.repeat(np.array(audio_files, dtype=object), n_clips),
+                        np.tile(clip_df_template["start_time"], len(audio_files)),
+                        np.tile(clip_df_template["end_time"], len(audio_files)),
+                    ],
+                    names=["file", "start_time", "end_time"],
+                )
+            )
 
         # then create 0/1 labels for each clip and each class
         return self.one_hot_labels_like(
@@ -826,46 +857,90 @@ def one_hot_labels_on_time_interval(
     Returns:
         dictionary of {class:label 0/1} for all classes
     """
-    # create a copy of the dataframe to avoid modifying the original
-    df = df.copy()
-
-    # calculate amount of overlap of each clip with this time window
-    df["overlap"] = [
-        overlap([start_time, end_time], [t0, t1])
-        for t0, t1 in zip(df["start_time"], df["end_time"])
-    ]
-
-    # discard annotations that do not overlap with the time window
-    df = df[df["overlap"] > 0].reset_index()
-
-    # calculate the fraction of each annotation that overlaps with this time window
-    df["overlap_fraction"] = [
-        overlap_fraction([t0, t1], [start_time, end_time])
-        for t0, t1 in zip(df["start_time"], df["end_time"])
-    ]
-
-    one_hot_labels = [0] * len(class_subset)
-    for i, c in enumerate(class_subset):
-        # subset annotations to those of this class
-        df_cls = df[df["annotation"] == c]
-
-        if len(df_cls) == 0:
-            continue  # no annotations, leave it as zero
-
-        # add label=1 if any annotation overlaps with the clip by >= min_overlap
-        if max(df_cls.overlap) >= min_label_overlap:
-            one_hot_labels[i] = 1
-
-        elif (  # add label=1 if annotation's overlap exceeds minimum fraction
-            min_label_fraction is not None
-            and max(df_cls.overlap_fraction) >= min_label_fraction
-        ):
-            one_hot_labels[i] = 1
-        else:  # otherwise, we leave the label as 0
-            pass
+    one_hot_labels = _one_hot_labels_on_time_intervals(
+        df,
+        class_subset=class_subset,
+        start_times=[start_time],
+        end_times=[end_time],
+        min_label_overlap=min_label_overlap,
+        min_label_fraction=min_label_fraction,
+    )[0]
 
     # return a dictionary mapping classes to 0/1 labels
-    return {c: l for c, l in zip(class_subset, one_hot_labels)}
+    return {c: l for c, l in zip(class_subset, one_hot_labels.tolist())}
+
+
+def _one_hot_labels_on_time_intervals(
+    df, class_subset, start_times, end_times, min_label_overlap, min_label_fraction
+):
+    """generate one-hot labels for many time intervals at once
+
+    Equivalent to calling `one_hot_labels_on_time_interval()` for each pair of
+    start and end times. Rather than comparing every interval with every
+    annotation, intervals are sorted by start time and a binary search finds
+    the few intervals each annotation could overlap.
+
+    Args:
+        df, class_subset, min_label_overlap, min_label_fraction:
+            see `one_hot_labels_on_time_interval()`
+        start_times: beginning of each time interval (seconds)
+        end_times: end of each time interval (seconds)
+
+    Returns:
+        array of 0/1 labels with a row for each time interval and a column for
+        each class in class_subset
+    """
+    start_times = np.asarray(start_times, dtype=float)
+    end_times = np.asarray(end_times, dtype=float)
+    annotation_starts = df["start_time"].to_numpy(dtype=float)
+    annotation_ends = df["end_time"].to_numpy(dtype=float)
+
+    # integer code of each annotation's class, or -1 if not in class_subset
+    class_codes = {c: i for i, c in enumerate(class_subset)}
+    codes = df["annotation"].map(class_codes).fillna(-1).to_numpy(dtype=int)
+
+    # an interval can only overlap an annotation if it starts before the
+    # annotation ends, and after the annotation start minus the longest
+    # interval duration. Bracket these intervals for each annotation with
+    # binary searches on the sorted interval start times
+    order = np.argsort(start_times, kind="stable")
+    sorted_starts = start_times[order]
+    max_duration = np.max(end_times - start_times, initial=0)
+    first = np.searchsorted(sorted_starts, annotation_starts - max_duration)
+    last = np.searchsorted(sorted_starts, annotation_ends)
+    n_candidates = np.maximum(last - first, 0)
+    n_candidates[codes < 0] = 0  # skip annotations not in class_subset
+
+    # expand the brackets into candidate (interval, annotation) pairs
+    annotation_idx = np.repeat(np.arange(len(codes)), n_candidates)
+    offsets = np.arange(n_candidates.sum()) - np.repeat(
+        np.cumsum(n_candidates) - n_candidates, n_candidates
+    )
+    interval_idx = order[np.repeat(first, n_candidates) + offsets]
+
+    # calculate amount of overlap of each candidate pair
+    pair_starts = annotation_starts[annotation_idx]
+    pair_ends = annotation_ends[annotation_idx]
+    overlaps = np.minimum(end_times[interval_idx], pair_ends) - np.maximum(
+        start_times[interval_idx], pair_starts
+    )
+
+    # an annotation counts if it overlaps by >= min_label_overlap
+    # or if >= min_label_fraction of the annotation overlaps
+    is_label = overlaps >= min_label_overlap
+    if min_label_fraction is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fractions = overlaps / (pair_ends - pair_starts)
+        is_label |= fractions >= min_label_fraction
+
+    # discard annotations that do not overlap with the time interval
+    is_label &= overlaps > 0
+
+    # scatter a 1 into the class column of each (interval, annotation) match
+    one_hot_labels = np.zeros((len(start_times), len(class_subset)), dtype=int)
+    one_hot_labels[interval_idx[is_label], codes[annotation_idx[is_label]]] = 1
+
+    return one_hot_labels
 
 
 def categorical_to_one_hot(labels, class_subset=None):
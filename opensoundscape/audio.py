@@ -86,7 +86,9 @@ class Audio:
                 "Initializing an Audio object requires samples to be a numpy "
                 "array or list"
             )
-        self.samples = np.array(self.samples).astype("float32")
+        # avoid copying samples that are already a float32 array: for instance,
+        # trimmed Audio objects hold a view of the original object's samples
+        self.samples = np.asarray(self.samples, dtype=np.float32)
 
         try:
             self.sample_rate = int(self.sample_rate)
@@ -775,7 +777,7 @@ class Audio:
             # dBFS is defined as 20*log10(V), so V = 10^(dBFS/20)
             peak_level = 10 ** (peak_dBFS / 20)
 
-        abs_max = max(max(self.samples), -min(self.samples))
+        abs_max = np.abs(self.samples).max()
         if abs_max == 0:
             # don't try to normalize 0-valued samples. Return original object
             abs_max = 1
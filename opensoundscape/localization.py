@@ -1,7 +1,9 @@
 """Tools for localizing audio events from synchronized recording arrays"""
 import warnings
+from functools import lru_cache
 import numpy as np
 import datetime
+from scipy.linalg import lstsq
 
 from opensoundscape.audio import Audio
 from opensoundscape import audio
@@ -784,6 +786,46 @@ def localize(receiver_locations, tdoas, algorithm, speed_of_sound=SPEED_OF_SOUND
     return estimate
 
 
+def localize_events(
+    receiver_locations,
+    arrival_times,
+    algorithm="gillette",
+    speed_of_sound=SPEED_OF_SOUND,
+    num_workers=1,
+    prefer="threads",
+):
+    """
+    Perform TDOA localization on many sound events recorded by the same receivers
+
+    Each event is localized independently with `localize()`, so events can be
+    distributed across workers with joblib. Useful for scan-wide workloads where
+    a fixed receiver array records thousands of events.
+
+    Args:
+        receiver_locations: a list of [x,y] or [x,y,z] locations for each receiver
+            locations should be in meters, e.g., the UTM coordinate system.
+        arrival_times: 2d array-like with one row per event, containing the
+            TDOA times (in seconds) of the event at each receiver
+        algorithm: the algorithm to use for localization
+            Options: 'soundfinder', 'gillette'
+        speed_of_sound: speed of sound in m/s
+        num_workers: number of parallel jobs [default: 1]. -1 uses all cores.
+        prefer: joblib backend preference, "threads" [default] or "processes".
+            The localization algorithms spend most of their time in NumPy/LAPACK,
+            which release the GIL, so threads avoid the cost of starting processes.
+            Use "processes" if per-event Python overhead dominates.
+
+    Returns:
+        list of estimated source locations (in meters), one per event
+    """
+    from joblib import Parallel, delayed
+
+    return Parallel(n_jobs=num_workers, prefer=prefer)(
+        delayed(localize)(receiver_locations, t, algorithm, speed_of_sound)
+        for t in arrival_times
+    )
+
+
 def soundfinder_localize(
     receiver_locations,
     arrival_times,
@@ -791,6 +833,7 @@ def soundfinder_localize(
     invert_alg="gps",  # options: 'gps'
     center=True,  # True for original Sound Finder behavior
     pseudo=True,  # False for original Sound Finder
+    dtype=np.float64,
 ):
     """
     Use the soundfinder algorithm to perform TDOA localization on a sound event
@@ -817,6 +860,11 @@ def soundfinder_localize(
           sum of squares discrepancy (False) to pick the solution to return
           (For behavior of original Sound Finder, use False. However,
           in initial tests, pseudorange error appears to perform better.)
+        dtype: floating point precision used for the linear algebra
+          [default: np.float64]. np.float32 halves memory use and is faster
+          when localizing many events; receivers are centered in float64
+          before casting (if `center=True`) to limit loss of precision
+          with large (e.g. UTM) coordinates.
     Returns:
         The solution (x,y,z) in meters.
 
@@ -830,7 +878,7 @@ def soundfinder_localize(
 
     # make sure our inputs follow consistent format
     receiver_locations = np.array(receiver_locations).astype("float64")
-    arrival_times = np.array(arrival_times).astype("float64")
+    arrival_times = np.array(arrival_times).astype(dtype, copy=False)
 
     # The number of dimensions in which to perform localization
     dim = receiver_locations.shape[1]
@@ -840,6 +888,7 @@ def soundfinder_localize(
     if center:
         p_mean = np.mean(receiver_locations, 0)
         receiver_locations = np.array([p - p_mean for p in receiver_locations])
+    receiver_locations = receiver_locations.astype(dtype, copy=False)
 
     ##### Compute B, a, and e #####
     # these correspond to [2] and are defined directly after equation 6
@@ -852,7 +901,7 @@ def soundfinder_localize(
     B = np.concatenate((receiver_locations, rho), axis=1)
 
     # e is a vector of ones
-    e = np.ones(receiver_locations.shape[0])
+    e = np.ones(receiver_locations.shape[0], dtype=dtype)
 
     # a is a 1/2 times a vector of squared Lorentz norms
     a = 0.5 * np.apply_along_axis(lorentz_ip, axis=1, arr=B)
@@ -878,21 +927,17 @@ def soundfinder_localize(
         except np.linalg.LinAlgError as err:
             # for 'gps' algorithm, simply fail
             # if invert_alg == "gps":
-            warnings.warn("4")
             if "Singular matrix" in str(err):
-                warnings.warn("5")
                 warnings.warn(
                     "Singular matrix. Were recorders linear or on same plane? Exiting with NaN outputs",
                     UserWarning,
                 )
                 return [[np.nan]] * (dim)
             else:
-                warnings.warn("6")
                 raise
 
             # for 'special' algorithm: Fall back to lstsq algorithm
             # elif invert_alg == "special":  #
-            #     warnings.warn("7")
             #     Bplus_e = np.linalg.lstsq(B, e, rcond=None)[0]
             #     Bplus_a = np.linalg.lstsq(B, a, rcond=None)[0]
 
@@ -924,32 +969,17 @@ def soundfinder_localize(
     # Compute options for lambda
     lamb = (-cB + np.array([-1, 1]) * np.sqrt(disc)) / (2 * cA)
 
-    # Find solution u0 and solution u1
-    ale0 = np.add(a, lamb[0] * e)
-    u0 = np.matmul(Bplus, ale0)
-    ale1 = np.add(a, lamb[1] * e)
-    u1 = np.matmul(Bplus, ale1)
-
-    # print('Solution 1: {}'.format(u0))
-    # print('Solution 2: {}'.format(u1))
+    # Find solutions u0 and u1, as rows of a (2, dim+1) array
+    # u = B+ (a + lambda e) is affine in lambda, so reuse B+ a and B+ e
+    u_both = Bplus_a[None, :] + lamb[:, None] * Bplus_e[None, :]
 
     ##### Return the better solution #####
 
-    # Re-translate points
-    if center:
-        shift = np.append(p_mean, 0)  # 0 for b=error, which we don't need to shift
-        u0 += shift
-        u1 += shift
-
-    # Select and return quadratic solution
+    # Select quadratic solution
     if pseudo:
-        # Return the solution with the lower estimate of b, error in pseudorange
-        # drop the estimate of b (error in pseudorange) from the return values,
-        # returning just the location vector
-        if abs(u0[-1]) <= abs(u1[-1]):
-            return u0[0:-1]
-        else:
-            return u1[0:-1]
+        # Use the solution with the lower estimate of b, error in pseudorange
+        # (argmin returns the first solution in case of a tie)
+        best_idx = np.argmin(np.abs(u_both[:, -1]))
 
     else:
         # use the sum of squares discrepancy to choose the solution
@@ -957,16 +987,61 @@ def soundfinder_localize(
         # but it gives worse performance
 
         # Compute sum of squares discrepancies for each solution
-        s0 = float(np.sum((np.matmul(B, u0) - np.add(a, lamb[0] * e)) ** 2))
-        s1 = float(np.sum((np.matmul(B, u1) - np.add(a, lamb[1] * e)) ** 2))
-
-        # Return the solution with lower sum of squares discrepancy
-        # drop the final value, which is the estimate of b, error in the pseudorange,
-        # returning just the location vector
-        if s0 < s1:
-            return u0[0:-1]
-        else:
-            return u1[0:-1]
+        # Note: discrepancies are computed after re-translating the solutions
+        shifted = u_both + np.append(p_mean, 0) if center else u_both
+        residuals = np.matmul(shifted, B.T) - (a[None, :] + lamb[:, None] * e[None, :])
+        s0, s1 = np.sum(residuals**2, axis=1)
+
+        # Use the solution with lower sum of squares discrepancy
+        best_idx = 0 if s0 < s1 else 1
+
+    u = u_both[best_idx]
+
+    # Re-translate points
+    if center:
+        shift = np.append(p_mean, 0)  # 0 for b=error, which we don't need to shift
+        u = u + shift
+
+    # drop the final value, which is the estimate of b, error in the pseudorange,
+    # returning just the location vector
+    return u[0:-1]
+
+
+@lru_cache(maxsize=128)
+def _gillette_geometry(receivers_bytes, n_receivers, dim, ref_receiver):
+    """compute the geometry-only terms of the Gillette & Silverman system
+
+    Receiver positions are typically fixed across many localized events, so
+    these terms are cached. Arguments must be hashable, so receiver positions
+    are passed as the bytes of a float64 array.
+
+    Args:
+        receivers_bytes: `.tobytes()` of float64 array of receiver positions
+        n_receivers: number of receivers (rows of the positions array)
+        dim: number of spatial dimensions (columns of the positions array)
+        ref_receiver: index of the reference receiver
+
+    Returns:
+        A_geom: (n_receivers-1, dim) array, reference position minus other positions
+        half_sq_diff: (n_receivers-1,) array, 1/2 (x0^2+y0^2+z0^2 - xm^2-ym^2-zm^2)
+
+        Returned arrays are read-only since they are shared between calls
+    """
+    receiver_locations = np.frombuffer(receivers_bytes, dtype=np.float64).reshape(
+        n_receivers, dim
+    )
+    ref_xyz = receiver_locations[ref_receiver]
+    other_receivers = np.delete(receiver_locations, ref_receiver, axis=0)
+
+    A_geom = ref_xyz - other_receivers
+
+    X02 = np.dot(ref_xyz, ref_xyz)  # x0^2 + y0^2 + z0^2
+    XM2 = np.einsum("ij,ij->i", other_receivers, other_receivers)
+    half_sq_diff = 0.5 * (X02 - XM2)
+
+    A_geom.flags.writeable = False
+    half_sq_diff.flags.writeable = False
+    return A_geom, half_sq_diff
 
 
 def gillette_localize(receiver_locations, arrival_times, speed_of_sound=SPEED_OF_SOUND):
@@ -1004,29 +1079,35 @@ def gillette_localize(receiver_locations, arrival_times, speed_of_sound=SPEED_OF
     # The number of dimensions in which to perform localization
     dim = receiver_locations.shape[1]
 
-    # find which is the reference receiver and reorder, so reference receiver is first
-    ref_receiver = np.argmin(abs(arrival_times))
-    ordered_receivers = np.roll(receiver_locations, -ref_receiver, axis=0)
-    ordered_tdoas = np.roll(arrival_times, -ref_receiver, axis=0)
+    # find which is the reference receiver
+    ref_receiver = int(np.argmin(abs(arrival_times)))
+    n_receivers = len(arrival_times)
+
+    # the geometry-dependent parts of the system only depend on receiver positions
+    # and the choice of reference receiver, so they are cached across calls
+    A_geom, half_sq_diff = _gillette_geometry(
+        receiver_locations.tobytes(), n_receivers, dim, ref_receiver
+    )
+    # tdoas of non-reference receivers, in the same order as rows of A_geom
+    other_tdoas = np.delete(arrival_times, ref_receiver)
+
+    # range differences relative to the reference receiver
+    dmx = other_tdoas * speed_of_sound
 
     # Gillette silverman solves Ax = w, where x is the solution vector, A is a matrix, and w is a vector
     # Matrix A according to Gillette and Silverman (2008)
-    A = np.zeros((len(ordered_tdoas) - 1, dim + 1))
-    for column in range(dim + 1):
-        if column < dim:
-            A[:, column] = ordered_receivers[0, column] - ordered_receivers[1:, column]
-        elif column == dim:
-            A[:, column] = ordered_tdoas[1:] * speed_of_sound
+    # the first dim columns are receiver geometry, the last column is scaled tdoas
+    A = np.empty((n_receivers - 1, dim + 1))
+    A[:, :dim] = A_geom
+    A[:, dim] = dmx
 
     # Vector w according to Gillette and Silverman (2008)
     # w = 1/2 (dm0^2 - xm^2 - ym^2 - zm^2 + x0^2 + y0^2 + z0^2)
-    X02 = np.sum(ordered_receivers[0] ** 2)  # x0^2 + y0^2 + z0^2
-    dmx = ordered_tdoas[1:] * speed_of_sound
-    XM2 = np.sum(ordered_receivers**2, axis=1)[1:]
-
-    vec_w = 0.5 * (dmx + X02 - XM2)
+    vec_w = 0.5 * dmx + half_sq_diff
 
-    answer = np.linalg.lstsq(A, vec_w.T, rcond=None)
+    # the system is small (n_receivers-1 x dim+1), so the QR-based gelsy driver
+    # is faster than numpy's SVD-based gelsd and accurate enough
+    answer = lstsq(A, vec_w, lapack_driver="gelsy")
     coords = answer[0][:dim]
     # pseudorange = answer[0][dim]
     # residuals = answer[1]
@@ -133,6 +133,48 @@ def predict_multi_target_labels(scores, threshold):
         return preds
 
 
+def _label_metrics(targets, preds):
+    """compute per-class and overall metrics for 0/1 targets and predictions
+
+    Per-class true positive, false positive, and false negative counts are
+    computed once and all metrics are derived from them. Equivalent to
+    sklearn's precision_recall_fscore_support (zero_division=0),
+    jaccard_score (average="macro"), and hamming_loss.
+
+    Args:
+        targets: 0/1 labels in 2d array-like (samples x classes)
+        preds: 0/1 predictions in 2d array-like (samples x classes)
+
+    Returns:
+        dictionary with per-class arrays "precision", "recall", "f1", and
+        "support", and overall (macro) values "jaccard" and "hamming_loss"
+    """
+    targets = np.asarray(targets).astype(np.int64)
+    preds = np.asarray(preds).astype(np.int64)
+    if targets.shape != preds.shape:
+        raise ValueError(
+            f"targets and preds must have the same shape. "
+            f"Got {targets.shape} and {preds.shape}."
+        )
+
+    tp = (targets * preds).sum(0)
+    fp = preds.sum(0) - tp
+    fn = targets.sum(0) - tp
+
+    # classes with a denominator of zero are assigned a score of 0
+    def _safe_divide(numerator, denominator):
+        return numerator / np.maximum(denominator, 1)
+
+    return {
+        "precision": _safe_divide(tp, tp + fp),
+        "recall": _safe_divide(tp, tp + fn),
+        "f1": _safe_divide(2 * tp, 2 * tp + fp + fn),
+        "support": tp + fn,
+        "jaccard": _safe_divide(tp, tp + fp + fn).mean(),
+        "hamming_loss": (targets != preds).mean(),
+    }
+
+
 def multi_target_metrics(targets, scores, class_names, threshold):
     """generate various metrics for a set of scores and labels (targets)
 
@@ -160,9 +202,11 @@ def multi_target_metrics(targets, scores, class_names, threshold):
     preds = predict_multi_target_labels(scores=scores, threshold=threshold)
 
     # Store per-class precision, recall, and f1
-    class_pre, class_rec, class_f1, support = M.precision_recall_fscore_support(
-        targets, preds, average=None, zero_division=0
-    )
+    counts = _label_metrics(targets, preds)
+    class_pre = counts["precision"]
+    class_rec = counts["recall"]
+    class_f1 = counts["f1"]
+    support = counts["support"]
 
     for i, class_i in enumerate(class_names):
         n = support[i]  # number of samples for this class
@@ -195,14 +239,8 @@ def multi_target_metrics(targets, scores, class_names, threshold):
     metrics_dict["recall"] = class_rec.mean()
     metrics_dict["f1"] = class_f1.mean()
 
-    try:
-        metrics_dict["jaccard"] = M.jaccard_score(targets, preds, average="macro")
-    except ValueError:
-        metrics_dict["jaccard"] = np.nan
-    try:
-        metrics_dict["hamming_loss"] = M.hamming_loss(targets, preds)
-    except ValueError:
-        metrics_dict["hamming_loss"] = np.nan
+    metrics_dict["jaccard"] = counts["jaccard"]
+    metrics_dict["hamming_loss"] = counts["hamming_loss"]
     try:
         metrics_dict["map"] = M.average_precision_score(
             targets, scores, average="macro"
@@ -248,18 +286,11 @@ def single_target_metrics(targets, scores):
     metrics_dict["confusion_matrix"] = M.confusion_matrix(t, p)
 
     # precision, recall, and f1
-    pre, rec, f1, _ = M.precision_recall_fscore_support(
-        targets, preds, average=None, zero_division=0
-    )
+    counts = _label_metrics(targets, preds)
+    pre, rec, f1 = counts["precision"], counts["recall"], counts["f1"]
     metrics_dict.update({"precision": pre[1], "recall": rec[1], "f1": f1[1]})
 
-    try:
-        metrics_dict["jaccard"] = M.jaccard_score(targets, preds, average="macro")
-    except ValueError:
-        metrics_dict["jaccard"] = np.nan
-    try:
-        metrics_dict["hamming_loss"] = M.hamming_loss(targets, preds)
-    except ValueError:
-        metrics_dict["hamming_loss"] = np.nan
+    metrics_dict["jaccard"] = counts["jaccard"]
+    metrics_dict["hamming_loss"] = counts["hamming_loss"]
 
     return metrics_dict
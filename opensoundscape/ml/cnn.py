@@ -577,6 +577,9 @@ class CNN(BaseClassifier):
             shuffle=True,  # SHUFFLE SAMPLES because we are training
             # use pin_memory=True when loading files on CPU and training on GPU
             pin_memory=False if self.device == torch.device("cpu") else True,
+            # keep worker processes (and their copy of the preprocessor) alive
+            # across epochs rather than re-creating them for each epoch
+            persistent_workers=num_workers > 0,
         )
 
     def _train_epoch(self, train_loader, wandb_session=None, progress_bar=True):
@@ -29,6 +29,8 @@ Note: the InceptionV3 architecture must be used differently than other
 architectures - the easiest way is to simply use the InceptionV3 class in
 opensoundscape.ml.cnn.
 """
+import copy
+from functools import lru_cache
 import warnings
 
 import torch
@@ -52,165 +54,85 @@ def list_architectures():
     return list(ARCH_DICT.keys())
 
 
-def freeze_params(model):
-    """remove gradients (aka freeze) all model parameters"""
-    for param in model.parameters():
-        param.requires_grad = False
+@lru_cache(maxsize=1)
+def _pretrained_torchvision_model(name, weights):
+    """cached torchvision model with pre-trained weights; do not modify"""
+    return getattr(torchvision.models, name)(weights=weights)
 
 
-@register_arch
-def resnet18(
-    num_classes, freeze_feature_extractor=False, weights="DEFAULT", num_channels=3
-):
-    """Wrapper for ResNet18 architecture
-
-    input_size = 224
+def _load_torchvision_model(name, weights):
+    """create a torchvision model, eg 'resnet18', with the requested weights
 
-    Args:
-        num_classes:
-            number of output nodes for the final layer
-        freeze_feature_extractor:
-            if False (default), entire network will have gradients and can train
-            if True, feature block is frozen and only final layer is trained
-        weights:
-            string containing version name of the pre-trained classification weights to use for this architecture.
-            if 'DEFAULT', model is loaded with best available weights (note that these may change across versions).
-            Pre-trained weights available for each architecture are listed at https://pytorch.org/vision/stable/models.html
-        num_channels:
-            specify channels in input sample, eg [channels h,w] sample shape
+    The most recently used model with pre-trained weights is kept in memory,
+    and deep-copied on each call, so that repeated calls for the same
+    architecture don't reload its weights and callers can modify the returned
+    model. Models without weights are created on each call, so that each gets
+    its own random initialization. Use clear_pretrained_model_cache() to
+    release the cached model.
     """
-    architecture_ft = torchvision.models.resnet18(weights=weights)
-    if freeze_feature_extractor:
-        freeze_params(architecture_ft)
-
-    # change number of output nodes
-    architecture_ft.fc = change_fc_output_size(architecture_ft.fc, num_classes)
+    if weights is None:
+        return getattr(torchvision.models, name)(weights=weights)
+    return copy.deepcopy(_pretrained_torchvision_model(name, weights))
 
-    # change input shape num_channels
-    architecture_ft.conv1 = change_conv2d_channels(architecture_ft.conv1, num_channels)
 
-    # default target layers for activation maps like GradCAM and guided backpropagation
-    architecture_ft.cam_target_layers = [architecture_ft.layer4]
+@lru_cache(maxsize=1)
+def _pretrained_torchhub_model(repo, entrypoint, weights):
+    """cached torch.hub model with pre-trained weights; do not modify"""
+    torch.hub._validate_not_a_forked_repo = lambda a, b, c: True
+    return torch.hub.load(repo, entrypoint, pretrained=weights)
 
-    return architecture_ft
 
+def _load_torchhub_model(repo, entrypoint, weights):
+    """load a torch.hub model, caching it as _load_torchvision_model does"""
+    if not weights:
+        torch.hub._validate_not_a_forked_repo = lambda a, b, c: True
+        return torch.hub.load(repo, entrypoint, pretrained=weights)
+    return copy.deepcopy(_pretrained_torchhub_model(repo, entrypoint, weights))
 
-@register_arch
-def resnet34(
-    num_classes, freeze_feature_extractor=False, weights="DEFAULT", num_channels=3
-):
-    """Wrapper for ResNet34 architecture
 
-    input_size = 224
+def clear_pretrained_model_cache():
+    """release the pre-trained models cached by the architecture wrappers
 
-    Args:
-        num_classes:
-            number of output nodes for the final layer
-        freeze_feature_extractor:
-            if False (default), entire network will have gradients and can train
-            if True, feature block is frozen and only final layer is trained
-        weights:
-            string containing version name of the pre-trained classification weights to use for this architecture.
-            if 'DEFAULT', model is loaded with best available weights (note that these may change across versions).
-            Pre-trained weights available for each architecture are listed at https://pytorch.org/vision/stable/models.html
-        num_channels:
-            specify channels in input sample, eg [channels h,w] sample shape
+    The wrappers keep one model with pre-trained weights from torchvision and
+    one from torch.hub in memory, to speed up repeated construction of the
+    same architecture. Call this to free that memory, eg after building a model
+    that will not be built again.
     """
-    architecture_ft = torchvision.models.resnet34(weights=weights)
-    if freeze_feature_extractor:
-        freeze_params(architecture_ft)
+    _pretrained_torchvision_model.cache_clear()
+    _pretrained_torchhub_model.cache_clear()
 
-    # change number of output nodes
-    architecture_ft.fc = change_fc_output_size(architecture_ft.fc, num_classes)
-
-    # change input shape num_channels
-    architecture_ft.conv1 = change_conv2d_channels(architecture_ft.conv1, num_channels)
 
-    # default target layers for activation maps like GradCAM and guided backpropagation
-    architecture_ft.cam_target_layers = [architecture_ft.layer4]
-
-    return architecture_ft
-
-
-@register_arch
-def resnet50(
-    num_classes, freeze_feature_extractor=False, weights="DEFAULT", num_channels=3
-):
-    """Wrapper for ResNet50 architecture
-
-    input_size = 224
-
-    Args:
-        num_classes:
-            number of output nodes for the final layer
-        freeze_feature_extractor:
-            if False (default), entire network will have gradients and can train
-            if True, feature block is frozen and only final layer is trained
-        weights:
-            string containing version name of the pre-trained classification weights to use for this architecture.
-            if 'DEFAULT', model is loaded with best available weights (note that these may change across versions).
-            Pre-trained weights available for each architecture are listed at https://pytorch.org/vision/stable/models.html
-        num_channels:
-            specify channels in input sample, eg [channels h,w] sample shape
-    """
-    architecture_ft = torchvision.models.resnet50(weights=weights)
-    if freeze_feature_extractor:
-        freeze_params(architecture_ft)
-
-    # change number of output nodes
-    architecture_ft.fc = change_fc_output_size(architecture_ft.fc, num_classes)
-
-    # change input shape num_channels
-    architecture_ft.conv1 = change_conv2d_channels(architecture_ft.conv1, num_channels)
-
-    # default target layers for activation maps like GradCAM and guided backpropagation
-    architecture_ft.cam_target_layers = [architecture_ft.layer4]
-
-    return architecture_ft
-
-
-@register_arch
-def resnet101(
-    num_classes, freeze_feature_extractor=False, weights="DEFAULT", num_channels=3
-):
-    """Wrapper for ResNet101 architecture
+def freeze_params(model):
+    """remove gradients (aka freeze) all model parameters"""
+    for param in model.parameters():
+        param.requires_grad = False
 
-    input_size = 224
 
-    Args:
-        num_classes:
-            number of output nodes for the final layer
-        freeze_feature_extractor:
-            if False (default), entire network will have gradients and can train
-            if True, feature block is frozen and only final layer is trained
-        weights:
-            string containing version name of the pre-trained classification weights to use for this architecture.
-            if 'DEFAULT', model is loaded with best available weights (note that these may change across versions).
-            Pre-trained weights available for each architecture are listed at https://pytorch.org/vision/stable/models.html
-        num_channels:
-            specify channels in input sample, eg [channels h,w] sample shape
-    """
-    architecture_ft = torchvision.models.resnet101(weights=weights)
-    if freeze_feature_extractor:
-        freeze_params(architecture_ft)
+def _make_resnet(depth):
+    """create the architecture wrapper for ResNet of a given depth, eg 18"""
 
-    # change number of output nodes
-    architecture_ft.fc = change_fc_output_size(architecture_ft.fc, num_classes)
+    def resnet(
+        num_classes, freeze_feature_extractor=False, weights="DEFAULT", num_channels=3
+    ):
+        architecture_ft = _load_torchvision_model(f"resnet{depth}", weights)
+        if freeze_feature_extractor:
+            freeze_params(architecture_ft)
 
-    # change input shape num_channels
-    architecture_ft.conv1 = change_conv2d_channels(architecture_ft.conv1, num_channels)
+        # change number of output nodes
+        architecture_ft.fc = change_fc_output_size(architecture_ft.fc, num_classes)
 
-    # default target layers for activation maps like GradCAM and guided backpropagation
-    architecture_ft.cam_target_layers = [architecture_ft.layer4]
+        # change input shape num_channels
+        architecture_ft.conv1 = change_conv2d_channels(
+            architecture_ft.conv1, num_channels
+        )
 
-    return architecture_ft
+        # default target layers for activation maps like GradCAM and guided backpropagation
+        architecture_ft.cam_target_layers = [architecture_ft.layer4]
 
+        return architecture_ft
 
-@register_arch
-def resnet152(
-    num_classes, freeze_feature_extractor=False, weights="DEFAULT", num_channels=3
-):
-    """Wrapper for ResNet152 architecture
+    resnet.__name__ = resnet.__qualname__ = f"resnet{depth}"
+    resnet.__doc__ = f"""Wrapper for ResNet{depth} architecture
 
     input_size = 224
 
@@ -227,24 +149,14 @@ def resnet152(
         num_channels:
             specify channels in input sample, eg [channels h,w] sample shape
     """
-    architecture_ft = torchvision.models.resnet152(weights=weights)
-    if freeze_feature_extractor:
-        freeze_params(architecture_ft)
-
-    # prevent weights of feature extractor from being trained, if desired
-    if freeze_feature_extractor:
-        freeze_params(architecture_ft)
-
-    # change number of output nodes
-    architecture_ft.fc = change_fc_output_size(architecture_ft.fc, num_classes)
+    return register_arch(resnet)
 
-    # change input shape num_channels
-    architecture_ft.conv1 = change_conv2d_channels(architecture_ft.conv1, num_channels)
-
-    # default target layers for activation maps like GradCAM and guided backpropagation
-    architecture_ft.cam_target_layers = [architecture_ft.layer4]
 
-    return architecture_ft
+resnet18 = _make_resnet(18)
+resnet34 = _make_resnet(34)
+resnet50 = _make_resnet(50)
+resnet101 = _make_resnet(101)
+resnet152 = _make_resnet(152)
 
 
 @register_arch
@@ -268,7 +180,7 @@ def alexnet(
         num_channels:
             specify channels in input sample, eg [channels h,w] sample shape
     """
-    architecture_ft = torchvision.models.alexnet(weights=weights)
+    architecture_ft = _load_torchvision_model("alexnet", weights)
     if freeze_feature_extractor:
         freeze_params(architecture_ft)
 
@@ -308,7 +220,7 @@ def vgg11_bn(
             Pre-trained weights available for each architecture are listed at https://pytorch.org/vision/stable/models.html
 
     """
-    architecture_ft = torchvision.models.vgg11_bn(weights=weights)
+    architecture_ft = _load_torchvision_model("vgg11_bn", weights)
 
     if freeze_feature_extractor:
         freeze_params(architecture_ft)
@@ -350,7 +262,7 @@ def squeezenet1_0(
         num_channels:
             specify channels in input sample, eg [channels h,w] sample shape
     """
-    architecture_ft = torchvision.models.squeezenet1_0(weights=weights)
+    architecture_ft = _load_torchvision_model("squeezenet1_0", weights)
 
     # prevent weights of feature extractor from being trained, if desired
     if freeze_feature_extractor:
@@ -401,7 +313,7 @@ def densenet121(
             specify channels in input sample, eg [channels h,w] sample shape
 
     """
-    architecture_ft = torchvision.models.densenet121(weights=weights)
+    architecture_ft = _load_torchvision_model("densenet121", weights)
     if freeze_feature_extractor:
         freeze_params(architecture_ft)
 
@@ -445,7 +357,7 @@ def inception_v3(
         num_channels:
             specify channels in input sample, eg [channels h,w] sample shape
     """
-    architecture_ft = torchvision.models.inception_v3(weights=weights)
+    architecture_ft = _load_torchvision_model("inception_v3", weights)
     if freeze_feature_extractor:
         freeze_params(architecture_ft)
     # Handle the auxilary net
@@ -491,11 +403,8 @@ def efficientnet_b0(
             specify channels in input sample, eg [channels h,w] sample shape
 
     """
-    torch.hub._validate_not_a_forked_repo = lambda a, b, c: True
-    architecture_ft = torch.hub.load(
-        "NVIDIA/DeepLearningExamples:torchhub",
-        "nvidia_efficientnet_b0",
-        pretrained=weights,
+    architecture_ft = _load_torchhub_model(
+        "NVIDIA/DeepLearningExamples:torchhub", "nvidia_efficientnet_b0", weights
     )
 
     # prevent weights of feature extractor from being trained, if desired
@@ -538,11 +447,8 @@ def efficientnet_b4(
             specify channels in input sample, eg [channels h,w] sample shape
 
     """
-    torch.hub._validate_not_a_forked_repo = lambda a, b, c: True
-    architecture_ft = torch.hub.load(
-        "NVIDIA/DeepLearningExamples:torchhub",
-        "nvidia_efficientnet_b4",
-        pretrained=weights,
+    architecture_ft = _load_torchhub_model(
+        "NVIDIA/DeepLearningExamples:torchhub", "nvidia_efficientnet_b4", weights
     )
 
     # prevent weights of feature extractor from being trained, if desired
@@ -585,11 +491,8 @@ def efficientnet_widese_b0(
             specify channels in input sample, eg [channels h,w] sample shape
 
     """
-    torch.hub._validate_not_a_forked_repo = lambda a, b, c: True
-    architecture_ft = torch.hub.load(
-        "NVIDIA/DeepLearningExamples:torchhub",
-        "nvidia_efficientnet_widese_b0",
-        pretrained=weights,
+    architecture_ft = _load_torchhub_model(
+        "NVIDIA/DeepLearningExamples:torchhub", "nvidia_efficientnet_widese_b0", weights
     )
 
     # prevent weights of feature extractor from being trained, if desired
@@ -632,11 +535,8 @@ def efficientnet_widese_b4(
             specify channels in input sample, eg [channels h,w] sample shape
 
     """
-    torch.hub._validate_not_a_forked_repo = lambda a, b, c: True
-    architecture_ft = torch.hub.load(
-        "NVIDIA/DeepLearningExamples:torchhub",
-        "nvidia_efficientnet_widese_b4",
-        pretrained=weights,
+    architecture_ft = _load_torchhub_model(
+        "NVIDIA/DeepLearningExamples:torchhub", "nvidia_efficientnet_widese_b4", weights
     )
 
     # prevent weights of feature extractor from being trained, if desired
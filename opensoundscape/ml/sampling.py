@@ -1,4 +1,5 @@
 """classes for strategically sampling within a DataLoader"""
+import itertools
 import random
 import numpy as np
 import torch
@@ -132,6 +133,66 @@ class ClassAwareSampler(torch.utils.data.sampler.Sampler):
         return self.num_samples
 
 
+class DistributedSamplerWrapper(torch.utils.data.sampler.Sampler):
+    """Shard the indices of another sampler across distributed processes
+
+    Each process (rank) yields every `num_replicas`-th index of the wrapped
+    sampler, starting at index `rank`, so that processes train on disjoint
+    subsets of the sampled indices.
+
+    The shards are only disjoint if the wrapped sampler produces the same
+    sequence of indices in every process. Random samplers such as
+    ClassAwareSampler draw from python's `random` module (or torch's global
+    generator), so the wrapped sampler is iterated with both seeded with
+    `seed + epoch`; the previous random states are restored afterwards. As with
+    torch's DistributedSampler, call `set_epoch()` at the start of each epoch
+    to change the random seed between epochs.
+
+    Args:
+        sampler: the sampler to shard
+        num_replicas: number of processes [default: None uses
+            torch.distributed.get_world_size()]
+        rank: rank of this process [default: None uses
+            torch.distributed.get_rank()]
+        seed: random seed, must be the same in all processes [default: 0]
+    """
+
+    def __init__(self, sampler, num_replicas=None, rank=None, seed=0):
+        if num_replicas is None:
+            num_replicas = torch.distributed.get_world_size()
+        if rank is None:
+            rank = torch.distributed.get_rank()
+        self.sampler = sampler
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self):
+        # draw the full sequence of indices with identically seeded random
+        # states in every process, then take this process's shard
+        random_state = random.getstate()
+        try:
+            random.seed(self.seed + self.epoch)
+            with torch.random.fork_rng(devices=[]):
+                torch.manual_seed(self.seed + self.epoch)
+                indices = list(self.sampler)
+        finally:
+            random.setstate(random_state)
+        return itertools.islice(indices, self.rank, None, self.num_replicas)
+
+    def __len__(self):
+        return len(range(self.rank, len(self.sampler), self.num_replicas))
+
+    def set_epoch(self, epoch):
+        """set the epoch, which is added to `seed` when sampling indices
+
+        Args:
+            epoch: epoch number, must be the same in all processes
+        """
+        self.epoch = epoch
+
+
 def get_sampler():
     return ClassAwareSampler
 
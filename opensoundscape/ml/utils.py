@@ -1,5 +1,5 @@
 """Utilties for .ml"""
-import warnings
+import contextlib
 import pandas as pd
 import numpy as np
 import torch
@@ -7,10 +7,54 @@ import torch.nn.functional as F
 import pytorch_grad_cam
 import tqdm
 
-from opensoundscape.ml.sampling import ClassAwareSampler
+from opensoundscape.ml.sampling import ClassAwareSampler, DistributedSamplerWrapper
 
+# pytorch_grad_cam targets that can score a batch of model outputs at once
+_BATCHED_TARGETS = (
+    pytorch_grad_cam.utils.model_targets.ClassifierOutputTarget,
+    pytorch_grad_cam.utils.model_targets.ClassifierOutputSoftmaxTarget,
+)
 
-def cas_dataloader(dataset, batch_size, num_workers):
+
+def _cas_digit_labels(dataset):
+    """validate single-target labels of dataset.df and return digit labels
+
+    The result is cached on the dataset, keyed by the identity of dataset.df,
+    so that repeated calls (e.g. once per epoch) skip the work.
+
+    Returns:
+        array with index of the labeled class for each sample
+    """
+    cached = getattr(dataset, "_cas_digit_labels", None)
+    if cached is not None and cached[0] is dataset.df:
+        return cached[1]
+
+    # check that the data is single-target: every sample has exactly one label
+    labels = np.ascontiguousarray(dataset.df.values)
+    labels_per_file = labels.sum(axis=1)
+    if np.count_nonzero(labels_per_file != 1) > 0:
+        n_multi_target = np.count_nonzero(labels_per_file > 1)
+        if n_multi_target > 0:
+            raise AssertionError(
+                "Class Aware Sampler for multi-target labels is not implemented. "
+                f"Use single-target labels. {n_multi_target} samples had >1 label."
+            )
+        raise AssertionError(
+            "Class Aware Sampler requires that every sample have a label. "
+            f"{np.count_nonzero(labels_per_file == 0)} samples had 0 labels."
+        )
+
+    # we need to convert one-hot labels to digit labels for the CAS
+    # first class name -> 0, next class name -> 1, etc
+    digit_labels = labels.argmax(axis=1)
+
+    dataset._cas_digit_labels = (dataset.df, digit_labels)
+    return digit_labels
+
+
+def cas_dataloader(
+    dataset, batch_size, num_workers, prefetch_factor=4, collate_fn=None
+):
     """
     Return a dataloader that uses the class aware sampler
 
@@ -18,10 +62,27 @@ def cas_dataloader(dataset, batch_size, num_workers):
     It selects just a few classes to be present in each batch, then samples
     those classes for even representation in the batch.
 
+    If num_workers > 0, worker processes are kept alive between epochs
+    (persistent_workers=True) rather than re-created for each epoch. Batches
+    are copied to pinned memory by the DataLoader if cuda is available.
+    If torch.distributed is initialized, samples are sharded across processes
+    with DistributedSamplerWrapper, which samples with the same random seed in
+    every process. Call `loader.sampler.set_epoch(epoch)` at the start of each
+    epoch to change the seed between epochs.
+
+    The validated digit labels are cached on the dataset and reused by later
+    calls as long as `dataset.df` is the same object. If you modify
+    `dataset.df` in place, assign a new DataFrame (e.g. `dataset.df = df.copy()`)
+    so that the labels are recomputed.
+
     Args:
         dataset: a pytorch dataset type object
         batch_size: see DataLoader
         num_workers: see DataLoader
+        prefetch_factor: number of batches loaded in advance by each worker,
+            ignored if num_workers is 0 [default: 4]. See DataLoader
+        collate_fn: function to collate samples into batches
+            [default: None uses the DataLoader's default collate function]
     """
 
     if len(dataset) == 0:
@@ -29,30 +90,26 @@ def cas_dataloader(dataset, batch_size, num_workers):
 
     print("** USING CAS SAMPLER!! **")
 
-    # check that the data is single-target
-    max_labels_per_file = max(dataset.df.values.sum(1))
-    min_labels_per_file = min(dataset.df.values.sum(1))
-    assert (
-        max_labels_per_file <= 1
-    ), "Class Aware Sampler for multi-target labels is not implemented. Use single-target labels."
-    assert (
-        min_labels_per_file > 0
-    ), "Class Aware Sampler requires that every sample have a label. Some samples had 0 labels."
-
-    # we need to convert one-hot labels to digit labels for the CAS
-    # first class name -> 0, next class name -> 1, etc
-    digit_labels = dataset.df.values.argmax(1)
+    digit_labels = _cas_digit_labels(dataset)
 
     # create the class aware sampler object and DataLoader
     sampler = ClassAwareSampler(digit_labels, num_samples_cls=2)
 
+    # with distributed training, each process uses a disjoint shard of the samples
+    if torch.distributed.is_available() and torch.distributed.is_initialized():
+        sampler = DistributedSamplerWrapper(sampler)
+
     loader = torch.utils.data.DataLoader(
         dataset,
         batch_size=batch_size,
         shuffle=False,  # don't shuffle bc CAS does its own sampling
         num_workers=num_workers,
-        pin_memory=True,
+        # pinning is only useful for copying batches to a cuda device
+        pin_memory=torch.cuda.is_available(),
         sampler=sampler,
+        collate_fn=collate_fn,
+        persistent_workers=num_workers > 0,
+        prefetch_factor=prefetch_factor if num_workers > 0 else None,
     )
 
     return loader
@@ -73,6 +130,10 @@ def get_batch(array, batch_size, batch_number):
     Note: the final elements are returned as the last batch
     even if there are fewer than batch_size
 
+    Note: for np.ndarray or torch.Tensor inputs the batch is a view of
+    `array` (no copy), while slicing a list copies the batch. Convert long
+    lists to an array once before retrieving many batches.
+
     Example:
         if array=[1,2,3,4,5,6,7] then:
 
@@ -81,8 +142,32 @@ def get_batch(array, batch_size, batch_number):
         - get_batch(array,3,3) returns [7]
     """
     start_idx = batch_number * batch_size
-    end_idx = min((batch_number + 1) * batch_size, len(array))
-    return array[start_idx:end_idx]
+    # slicing stops at the end of the array, so the last batch may be shorter
+    return array[start_idx : start_idx + batch_size]
+
+
+def _softmax_logit(x):
+    """equivalent to torch.logit(F.softmax(x, dim=1)), computed in log space
+
+    logit(p) = log(p) - log(1-p), and log(p) is given directly by log_softmax.
+    This avoids a separate softmax pass, is more precise for small
+    probabilities, and does not use aten::logit (not implemented on mps).
+    """
+    log_p = F.log_softmax(x, dim=1)
+    return log_p - torch.log1p(-log_p.exp())
+
+
+# activation layer options for apply_activation_layer
+_ACTIVATION_LAYERS = {
+    # scores [-inf,inf]
+    None: lambda x: x,
+    # "softmax" activation: preds across all classes sum to 1
+    "softmax": lambda x: F.softmax(x.float(), dim=1),
+    # map [-inf,inf] to [0,1]
+    "sigmoid": torch.sigmoid,
+    # softmax, then remap scores from [0,1] to [-inf,inf]
+    "softmax_and_logit": lambda x: _softmax_logit(x.float()),
+}
 
 
 def apply_activation_layer(x, activation_layer=None):
@@ -106,35 +191,81 @@ def apply_activation_layer(x, activation_layer=None):
     if x is None:
         return None
 
-    x = torch.tensor(x)
-    if activation_layer is None:  # scores [-inf,inf]
-        pass
-    elif activation_layer == "softmax":
-        # "softmax" activation: preds across all classes sum to 1
-        x = F.softmax(x.float(), dim=1)
-    elif activation_layer == "sigmoid":
-        # map [-inf,inf] to [0,1]
-        x = torch.sigmoid(x)
-    elif activation_layer == "softmax_and_logit":
-        # softmax, then remap scores from [0,1] to [-inf,inf]
-        try:
-            x = torch.logit(F.softmax(x, dim=1))
-        except NotImplementedError:
-            # use cpu because mps aten::logit is not implemented yet
-            warnings.warn("falling back to CPU for logit operation")
-            original_device = x.device
-            x = torch.logit(F.softmax(x, dim=1).cpu()).to(original_device)
-
-    else:
+    try:
+        activation_fn = _ACTIVATION_LAYERS[activation_layer]
+    except (KeyError, TypeError):
         raise ValueError(f"invalid option for activation_layer: {activation_layer}")
 
-    return x
+    # avoid copying x if it is already a tensor (or shares memory with a tensor)
+    x = x if isinstance(x, torch.Tensor) else torch.as_tensor(x)
+    return activation_fn(x)
+
+
+def _score_outputs(target, outputs):
+    """apply a pytorch_grad_cam target to a batch of model outputs
+
+    ClassifierOutputTarget and ClassifierOutputSoftmaxTarget accept a batch of
+    outputs and return one score per output. Other targets are applied to each
+    output separately.
+
+    Returns:
+        1d tensor with one score per output, on the same device as outputs
+    """
+    if isinstance(target, _BATCHED_TARGETS):
+        return target(outputs)
+    return torch.stack([target(o) for o in outputs])
+
+
+def _uses_channels_last(model):
+    """check whether a model's 2d convolution weights use channels_last format
+
+    Inputs to such a model are fastest in channels_last format as well
+    (e.g. after `model.to(memory_format=torch.channels_last)`)
+    """
+    for param in model.parameters():
+        if param.dim() == 4:
+            return (
+                param.is_contiguous(memory_format=torch.channels_last)
+                and not param.is_contiguous()
+            )
+    return False
+
+
+def _normalize_activation_maps(maps):
+    """rescale each activation map to the range [0,1]
+
+    Args:
+        maps: tensor of shape [batch, channels, height, width]
+
+    Returns:
+        tensor of the same shape, with (maps-min)/(max-min) for each map
+    """
+    # min and max of each activation map, in a single reduction
+    mins, maxs = torch.aminmax(maps.view(maps.size(0), maps.size(1), -1), dim=-1)
+    mins, maxs = mins[:, :, None, None], maxs[:, :, None, None]
+    return (maps - mins) / (maxs - mins)
 
 
 # override pytorch_grad_cam's score cam class because it has a bug
 # with device mismatch of upsampled (cpu) vs input_tensor (may be mps, cuda, etc)
 class ScoreCAM(pytorch_grad_cam.base_cam.BaseCAM):
-    def __init__(self, model, target_layers, use_cuda=False, reshape_transform=None):
+    def __init__(
+        self,
+        model,
+        target_layers,
+        use_cuda=False,
+        reshape_transform=None,
+        use_amp=False,
+    ):
+        """ScoreCAM with device handling fixes
+
+        Args:
+            see pytorch_grad_cam.base_cam.BaseCAM, and:
+            use_amp: if True, compute the masked inputs and run the forward passes
+                in reduced precision (float16 on cuda, bfloat16 on other devices)
+                with torch.autocast. Faster, but the weights are less precise.
+                [default: False]
+        """
         super(ScoreCAM, self).__init__(
             model,
             target_layers,
@@ -142,42 +273,79 @@ class ScoreCAM(pytorch_grad_cam.base_cam.BaseCAM):
             reshape_transform=reshape_transform,
             uses_gradients=False,
         )
+        self.use_amp = use_amp
 
     def get_cam_weights(self, input_tensor, target_layer, targets, activations, grads):
-        with torch.no_grad():
-            upsample = torch.nn.UpsamplingBilinear2d(size=input_tensor.shape[-2:])
-            activation_tensor = torch.from_numpy(activations)
-            if self.cuda:
-                activation_tensor = activation_tensor.cuda()
-
-            upsampled = upsample(activation_tensor)
-
-            maxs = upsampled.view(upsampled.size(0), upsampled.size(1), -1).max(dim=-1)[
-                0
-            ]
-            mins = upsampled.view(upsampled.size(0), upsampled.size(1), -1).min(dim=-1)[
-                0
-            ]
-
-            maxs, mins = maxs[:, :, None, None], mins[:, :, None, None]
-            upsampled = (upsampled - mins) / (maxs - mins)
-
-            upsampled = upsampled.to(input_tensor.device)
-            input_tensors = input_tensor[:, None, :, :] * upsampled[:, :, None, :, :]
+        if self.use_amp:
+            device_type = input_tensor.device.type
+            amp_dtype = torch.float16 if device_type == "cuda" else torch.bfloat16
+            amp_context = torch.autocast(device_type=device_type, dtype=amp_dtype)
+        else:
+            amp_context = contextlib.nullcontext()
+
+        with torch.inference_mode(), amp_context:
+            # move activations to the input's device once, before upsampling
+            # (pinned host memory allows an asynchronous copy to cuda)
+            if isinstance(activations, torch.Tensor):
+                activation_tensor = activations
+            else:
+                activation_tensor = torch.from_numpy(activations)
+                if input_tensor.device.type == "cuda":
+                    activation_tensor = activation_tensor.pin_memory()
+            activation_tensor = activation_tensor.to(
+                input_tensor.device, non_blocking=True
+            )
+            if self.use_amp:
+                activation_tensor = activation_tensor.to(amp_dtype)
+                input_tensor = input_tensor.to(amp_dtype)
+
+            # equivalent to torch.nn.UpsamplingBilinear2d, without creating a module
+            upsampled = F.interpolate(
+                activation_tensor.contiguous(),
+                size=input_tensor.shape[-2:],
+                mode="bilinear",
+                align_corners=True,
+            )
+
+            upsampled = _normalize_activation_maps(upsampled)
 
             if hasattr(self, "batch_size"):
                 BATCH_SIZE = self.batch_size
             else:
                 BATCH_SIZE = 16
 
-            scores = []
-            for target, tensor in zip(targets, input_tensors):
-                for i in tqdm.tqdm(range(0, tensor.size(0), BATCH_SIZE)):
-                    batch = tensor[i : i + BATCH_SIZE, :]
-                    outputs = [target(o).cpu().item() for o in self.model(batch)]
-                    scores.extend(outputs)
-            scores = torch.Tensor(scores)
-            scores = scores.view(activations.shape[0], activations.shape[1])
+            # score the input masked by each activation map, in a single pass over
+            # all (sample, activation map) pairs so that every forward pass
+            # except the last uses a full batch
+            # scores stay on the device and are copied to the cpu once at the end
+            n_maps = upsampled.size(1)
+            channels_last = _uses_channels_last(self.model)
+            n_pairs = upsampled.size(0) * n_maps
+            scores = torch.empty(n_pairs, device=input_tensor.device)
+            for start in tqdm.tqdm(range(0, n_pairs, BATCH_SIZE)):
+                end = min(start + BATCH_SIZE, n_pairs)
+                pair_idx = torch.arange(start, end, device=input_tensor.device)
+                sample_idx, map_idx = pair_idx // n_maps, pair_idx % n_maps
+
+                # mask the inputs with a batch of activation maps: [k, C, H, W]
+                # (creating each batch on the fly avoids holding all masked
+                # copies of the inputs in memory at once)
+                batch = (
+                    input_tensor[sample_idx]
+                    * upsampled[sample_idx, map_idx][:, None, :, :]
+                )
+                if channels_last:
+                    batch = batch.contiguous(memory_format=torch.channels_last)
+                outputs = self.model(batch)
+
+                # apply each sample's target to the outputs for that sample
+                for b in range(start // n_maps, (end - 1) // n_maps + 1):
+                    lo = max(start, b * n_maps) - start
+                    hi = min(end, (b + 1) * n_maps) - start
+                    scores[start + lo : start + hi] = _score_outputs(
+                        targets[b], outputs[lo:hi]
+                    )
+            scores = scores.cpu().view(activations.shape[0], activations.shape[1])
             weights = torch.nn.Softmax(dim=-1)(scores).numpy()
             return weights
 
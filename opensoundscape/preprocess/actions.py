@@ -10,6 +10,7 @@ for details on how to use and create your own actions.
 """
 import random
 import warnings
+from functools import lru_cache
 import numpy as np
 import torchvision
 import torch
@@ -63,6 +64,19 @@ class BaseAction:
     def get(self, arg):
         return self.params[arg]
 
+    def _merged_params(self, kwargs):
+        """dictionary of self.params updated with kwargs, for calling action_fn
+
+        builds the dictionary from the Series' index and values arrays, which is
+        much faster than iterating over the Series (this is called per sample).
+        The dictionary is not cached, so that changes made directly to
+        self.params (eg `action.params.input_mean = 1`) take effect.
+        """
+        params = dict(zip(self.params.index, self.params.values))
+        if kwargs:
+            params.update(kwargs)
+        return params
+
 
 class Action(BaseAction):
     """Action class for an arbitrary function
@@ -119,12 +133,12 @@ class Action(BaseAction):
         # to use other attributes of sample.data, write another class and override
         # this go() method, for example:
         # def go(self, sample, **kwargs):
-        #   self.action_fn(sample, **dict(self.params, **kwargs))
+        #   self.action_fn(sample, **self._merged_params(kwargs))
 
         # should we make a copy to avoid modifying the original object?
         # or accept that we are modifying the original sample in-place?
         # I think its in-place since we now pass an object and update the data
-        sample.data = self.action_fn(sample.data, **dict(self.params, **kwargs))
+        sample.data = self.action_fn(sample.data, **self._merged_params(kwargs))
 
 
 class AudioClipLoader(Action):
@@ -150,7 +164,7 @@ class AudioClipLoader(Action):
         offset = 0 if sample.start_time is None else sample.start_time
         duration = None if sample.duration is None else sample.duration
         sample.data = self.action_fn(
-            sample.data, offset=offset, duration=duration, **dict(self.params, **kwargs)
+            sample.data, offset=offset, duration=duration, **self._merged_params(kwargs)
         )
 
 
@@ -165,7 +179,7 @@ class AudioTrim(Action):
         super(AudioTrim, self).__init__(trim_audio, **kwargs)
 
     def go(self, sample, **kwargs):
-        self.action_fn(sample, **dict(self.params, **kwargs))
+        self.action_fn(sample, **self._merged_params(kwargs))
 
 
 def trim_audio(sample, extend=True, random_trim=False, tol=1e-5):
@@ -244,7 +258,7 @@ class SpectrogramToTensor(Action):
         # sample should have attributes: height, width, channels
         # use info from sample for desired shape and n channels
         kwargs.update(shape=[sample.height, sample.width], channels=sample.channels)
-        sample.data = self.action_fn(sample.data, **dict(self.params, **kwargs))
+        sample.data = self.action_fn(sample.data, **self._merged_params(kwargs))
 
 
 def audio_random_gain(audio, dB_range=(-30, 0), clip_range=(-1, 1)):
@@ -300,6 +314,29 @@ def audio_add_noise(audio, noise_dB=-30, signal_dB=0, color="white"):
     return mix([audio, noise], gain=[signal_dB, 0])
 
 
+def _hashable(value):
+    """convert lists or arrays (eg of parameters) to tuples for use as cache keys"""
+    return tuple(value) if isinstance(value, (list, np.ndarray)) else value
+
+
+# torchvision transforms draw new random parameters each time they are called,
+# so a single instance can be re-used for every sample with the same settings
+
+
+@lru_cache(maxsize=32)
+def _color_jitter_transform(brightness, contrast, saturation, hue):
+    return torchvision.transforms.ColorJitter(
+        brightness=brightness, contrast=contrast, saturation=saturation, hue=hue
+    )
+
+
+@lru_cache(maxsize=32)
+def _random_affine_transform(degrees, translate, fill):
+    return torchvision.transforms.RandomAffine(
+        degrees=degrees, translate=translate, fill=list(fill)
+    )
+
+
 def torch_color_jitter(tensor, brightness=0.3, contrast=0.3, saturation=0.3, hue=0):
     """Wraps torchvision.transforms.ColorJitter
 
@@ -315,12 +352,11 @@ def torch_color_jitter(tensor, brightness=0.3, contrast=0.3, saturation=0.3, hue
     Returns:
         modified tensor
     """
-    transform = torchvision.transforms.Compose(
-        [
-            torchvision.transforms.ColorJitter(
-                brightness=brightness, contrast=contrast, saturation=saturation, hue=hue
-            )
-        ]
+    transform = _color_jitter_transform(
+        _hashable(brightness),
+        _hashable(contrast),
+        _hashable(saturation),
+        _hashable(hue),
     )
     return transform(tensor)
 
@@ -346,15 +382,9 @@ def torch_random_affine(tensor, degrees=0, translate=(0.3, 0.1), fill=0):
     """
 
     channels = tensor.shape[-3]
-    fill = [fill] * channels
+    fill = (fill,) * channels
 
-    transform = torchvision.transforms.Compose(
-        [
-            torchvision.transforms.RandomAffine(
-                degrees=degrees, translate=translate, fill=fill
-            )
-        ]
-    )
+    transform = _random_affine_transform(_hashable(degrees), _hashable(translate), fill)
     return transform(tensor)
 
 
@@ -367,18 +397,28 @@ def image_to_tensor(img, greyscale=False):
         img: PIL.Image
         greyscale: if False, converts image to RGB (3 channels).
             If True, converts image to one channel.
-    """
-    if greyscale:
-        img = img.convert("L")
-    else:
-        img = img.convert("RGB")
 
-    transform = torchvision.transforms.Compose([torchvision.transforms.ToTensor()])
-    return transform(img)
+    Note: SpectrogramToTensor creates tensors directly from Spectrograms; this
+    function is only needed for pipelines that create PIL images.
+    """
+    # greyscale images are not converted to RGB with PIL: instead, the single
+    # channel is repeated after converting to a tensor
+    if img.mode != "L" and (greyscale or img.mode != "RGB"):
+        img = img.convert("L" if greyscale else "RGB")
+    array = np.array(img, dtype=np.uint8)
+    if array.ndim == 2:  # add channel dimension
+        array = array[np.newaxis, :, :]
+    else:  # move channel dimension first: [h,w,c] -> [c,h,w]
+        array = np.ascontiguousarray(array.transpose(2, 0, 1))
+
+    tensor = torch.from_numpy(array).to(torch.float32).div_(255)
+    if not greyscale and tensor.shape[0] == 1:
+        tensor = tensor.repeat(3, 1, 1)
+    return tensor
 
 
 def scale_tensor(tensor, input_mean=0.5, input_std=0.5):
-    """linear scaling of tensor values using torch.transforms.Normalize
+    """linear scaling of tensor values: (tensor - input_mean) / input_std
 
     (Tensor->Tensor)
 
@@ -395,17 +435,27 @@ def scale_tensor(tensor, input_mean=0.5, input_std=0.5):
     Returns:
         modified tensor
     """
-    transform = torchvision.transforms.Compose(
-        [torchvision.transforms.Normalize(input_mean, input_std)]
-    )
-    return transform(tensor)
+    # input_mean and input_std can be scalars or per-channel sequences (as in
+    # torchvision.transforms.Normalize); broadcast per-channel values over (h,w)
+    input_mean = torch.as_tensor(input_mean, dtype=tensor.dtype, device=tensor.device)
+    input_std = torch.as_tensor(input_std, dtype=tensor.dtype, device=tensor.device)
+    if input_mean.ndim > 0:
+        input_mean = input_mean.view(-1, 1, 1)
+    if input_std.ndim > 0:
+        input_std = input_std.view(-1, 1, 1)
+
+    # one new tensor for the subtraction, then an in-place multiplication by
+    # 1/input_std (cheaper than dividing every element)
+    return tensor.sub(input_mean).mul_(input_std.reciprocal())
 
 
 def time_mask(tensor, max_masks=3, max_width=0.2):
     """add random vertical bars over sample (Tensor -> Tensor)
 
     Args:
-        tensor: input Torch.tensor sample
+        tensor: input Torch.tensor sample (channels, height, width), or a batch
+            of samples (batch, channels, height, width). Each sample in a batch
+            receives its own randomly placed bars.
         max_masks: maximum number of vertical bars [default: 3]
         max_width: maximum size of bars as fraction of sample width
 
@@ -416,23 +466,21 @@ def time_mask(tensor, max_masks=3, max_width=0.2):
     # convert max_width from fraction of sample to pixels
     max_width_px = int(tensor.shape[-1] * max_width)
 
-    # add "batch" dimension expected by tensaug
-    tensor = tensor.unsqueeze(0)
-
-    # perform transform
-    tensor = tensaug.time_mask(tensor, T=max_width_px, max_masks=max_masks)
+    if tensor.dim() == 4:  # already batched
+        return tensaug.time_mask(tensor, T=max_width_px, max_masks=max_masks)
 
-    # remove "batch" dimension
-    tensor = tensor.squeeze(0)
-
-    return tensor
+    # add "batch" dimension expected by tensaug, then remove it
+    tensor = tensaug.time_mask(tensor.unsqueeze(0), T=max_width_px, max_masks=max_masks)
+    return tensor.squeeze(0)
 
 
 def frequency_mask(tensor, max_masks=3, max_width=0.2):
     """add random horizontal bars over Tensor
 
     Args:
-        tensor: input Torch.tensor sample
+        tensor: input Torch.tensor sample (channels, height, width), or a batch
+            of samples (batch, channels, height, width). Each sample in a batch
+            receives its own randomly placed bars.
         max_masks: max number of horizontal bars [default: 3]
         max_width: maximum size of horizontal bars as fraction of sample height
 
@@ -443,16 +491,12 @@ def frequency_mask(tensor, max_masks=3, max_width=0.2):
     # convert max_width from fraction of sample to pixels
     max_width_px = int(tensor.shape[-2] * max_width)
 
-    # add "batch" dimension expected by tensaug
-    tensor = tensor.unsqueeze(0)
+    if tensor.dim() == 4:  # already batched
+        return tensaug.freq_mask(tensor, F=max_width_px, max_masks=max_masks)
 
-    # perform transform
-    tensor = tensaug.freq_mask(tensor, F=max_width_px, max_masks=max_masks)
-
-    # remove "batch" dimension
-    tensor = tensor.squeeze(0)
-
-    return tensor
+    # add "batch" dimension expected by tensaug, then remove it
+    tensor = tensaug.freq_mask(tensor.unsqueeze(0), F=max_width_px, max_masks=max_masks)
+    return tensor.squeeze(0)
 
 
 def tensor_add_noise(tensor, std=1):
@@ -464,14 +508,133 @@ def tensor_add_noise(tensor, std=1):
     Note: be aware that scaling before/after this action will change the
     effect of a fixed stdev Gaussian noise
     """
-    noise = torch.empty_like(tensor).normal_(mean=0, std=std)
-    return tensor + noise
+    # scale and add in-place on the freshly generated noise tensor, so that
+    # no intermediate tensors are allocated and the input is not modified
+    return torch.randn_like(tensor).mul_(std).add_(tensor)
+
+
+def cast_tensor(tensor, dtype=torch.float32):
+    """change the data type of a tensor, eg to half precision (Tensor -> Tensor)
+
+    The tensor augmentations in this module (time_mask, frequency_mask,
+    tensor_add_noise, Overlay, scale_tensor, torch_random_affine) support
+    torch.bfloat16 and torch.float16 tensors. Casting immediately after creating
+    the tensor halves the memory traffic of the subsequent actions, for example:
+    ```
+    pre.insert_action(
+        "to_bfloat16",
+        Action(cast_tensor, dtype=torch.bfloat16),
+        after_key="to_tensor",
+    )
+    ```
+    Note that the model must accept inputs of the same dtype, and that
+    statistics of the inputs (eg for scale_tensor) should be computed on
+    float32 tensors.
+
+    Args:
+        tensor: torch.Tensor sample
+        dtype: torch.dtype of the returned tensor [default: torch.float32]
+
+    Returns:
+        tensor with the requested dtype (the input, if it already has this dtype)
+    """
+    return tensor.to(dtype)
 
 
 def always_true(x):
     return True
 
 
+def _binary_labels(labels):
+    """0/1 uint8 array of a sample's labels, nonzero labels are 1"""
+    return np.asarray(labels.values != 0, dtype=np.uint8)
+
+
+class _OverlayCandidates:
+    """positional (numpy) index of an overlay_df, for choosing overlay samples
+
+    Built once per overlay_df so that choosing an overlay sample does not
+    require pandas indexing or boolean masks over the whole dataframe.
+
+    Args:
+        overlay_df: dataframe of audio files (index) and labels (columns)
+    """
+
+    def __init__(self, overlay_df):
+        self.paths = overlay_df.index.to_numpy()
+        values = overlay_df.to_numpy()
+        # (n_rows, n_classes) C-contiguous 0/1 label matrix, nonzero labels are 1
+        self.labels = np.ascontiguousarray(values != 0, dtype=np.uint8)
+        # row positions of the positive samples for each class, so that choosing
+        # a sample of a specific class never requires masking the whole dataframe
+        positive = values == 1
+        self.class_rows = {
+            c: np.flatnonzero(positive[:, i]) for i, c in enumerate(overlay_df.columns)
+        }
+        self.columns = list(overlay_df.columns)
+
+        # arguments and label index that have already passed validate()
+        self._validated_args = None
+        self._validated_labels_index = None
+
+    def validate(self, overlay_class, overlay_prob, overlay_weight, labels):
+        """check arguments of overlay() against this overlay_df
+
+        raises AssertionError for invalid arguments. Since overlay() is called
+        for every sample with the same arguments, checks are skipped if the
+        arguments (and the labels' index object) match the last validated call.
+        """
+        args = (overlay_class, overlay_prob, _hashable(overlay_weight))
+        if args != self._validated_args:
+            assert overlay_class in ["different", None] or overlay_class in set(
+                self.columns
+            ), (
+                "overlay_class must be 'different' or None or in overlay_df.columns. "
+                f"got {overlay_class}"
+            )
+            assert (overlay_prob <= 1) and (overlay_prob >= 0), (
+                "overlay_prob" f"should be in range (0,1), was {overlay_prob}"
+            )
+
+            weight_error = (
+                f"overlay_weight should be between 0 and 1, was {overlay_weight}"
+            )
+
+            if hasattr(overlay_weight, "__iter__"):
+                assert (
+                    len(overlay_weight) == 2
+                ), "must provide a float or a range of min,max values for overlay_weight"
+                assert (
+                    overlay_weight[1] > overlay_weight[0]
+                ), "second value must be greater than first for overlay_weight"
+                for w in overlay_weight:
+                    assert w < 1 and w > 0, weight_error
+            else:
+                assert overlay_weight < 1 and overlay_weight > 0, weight_error
+
+            if overlay_class is not None:
+                assert (
+                    len(self.columns) > 0
+                ), "overlay_df must have labels if overlay_class is specified"
+                if overlay_class != "different":  # user specified a single class
+                    assert (
+                        len(self.class_rows[overlay_class]) > 0
+                    ), "overlay_df did not contain positive labels for overlay_class"
+            self._validated_args = args
+
+        # the labels of samples from a dataset share the same index object,
+        # so the classes only need to be compared for the first sample
+        if (
+            len(self.columns) > 0
+            and labels is not None
+            and labels.index is not self._validated_labels_index
+        ):
+            assert self.columns == list(
+                labels.index
+            ), "overlay_df mast have same columns as sample's _labels or no columns"
+            self._validated_labels_index = labels.index
+
+
 class Overlay(Action):
     """Action Class for augmentation that overlays samples on eachother
 
@@ -507,7 +670,6 @@ class Overlay(Action):
         self.returns_labels = True
 
         overlay_df = kwargs["overlay_df"]
-        overlay_df = overlay_df[~overlay_df.index.duplicated()]  # remove duplicates
 
         # warn the user if using "different" as overlay_class
         # and "different" is one of the model classes
@@ -525,15 +687,64 @@ class Overlay(Action):
 
         # move overlay_df from params to its own space so that it doesn't display with print(params)
         self.overlay_df = overlay_df
-        self.params = self.params.drop("overlay_df")  # removes it
+        self.params = self.params.drop(
+            ["overlay_df", "overlay_cache", "overlay_candidates"]
+        )  # removes them
+
+        # optional dictionary of {overlay_df index: preprocessed data}, see precompute()
+        self.overlay_cache = None
+
+    @property
+    def overlay_df(self):
+        return self._overlay_df
+
+    @overlay_df.setter
+    def overlay_df(self, overlay_df):
+        overlay_df = overlay_df[~overlay_df.index.duplicated()]  # remove duplicates
+        self._overlay_df = overlay_df
+        self._overlay_candidates = _OverlayCandidates(overlay_df)
 
     def go(self, sample, **kwargs):
         self.action_fn(
             sample,
             overlay_df=self.overlay_df,
-            **dict(self.params, **kwargs),
+            overlay_cache=self.overlay_cache,
+            overlay_candidates=self._overlay_candidates,
+            **self._merged_params(kwargs),
         )
 
+    def precompute(self, preprocessor, bypass_augmentations=False):
+        """preprocess every sample in overlay_df once and cache the results
+
+        Overlaying a sample normally re-runs `preprocessor`'s pipeline (loading
+        audio, creating a spectrogram, etc) on the chosen overlay sample. After
+        calling precompute(), the cached output is used instead, so overlays
+        cost only the blending operation. Samples that fail to preprocess are
+        left out of the cache and are handled as usual when chosen.
+
+        Note that random augmentations preceding the Overlay action in the
+        pipeline are performed only once per overlay sample, when the cache
+        is created. Set `self.overlay_cache = None` to stop using the cache.
+
+        Args:
+            preprocessor: the Preprocessor whose pipeline contains this action;
+                its actions are performed up to the first Overlay action
+            bypass_augmentations: if True, skip augmentations while creating
+                the cached samples [default: False]
+        """
+        cache = {}
+        for overlay_path, row in self.overlay_df.iterrows():
+            try:
+                overlay_sample = preprocessor.forward(
+                    AudioSample.from_series(row),
+                    break_on_type=Overlay,
+                    bypass_augmentations=bypass_augmentations,
+                )
+            except PreprocessingError:
+                continue
+            cache[overlay_path] = overlay_sample.data
+        self.overlay_cache = cache
+
 
 def overlay(
     sample,
@@ -544,6 +755,8 @@ def overlay(
     max_overlay_num=1,
     overlay_weight=0.5,
     criterion_fn=always_true,
+    overlay_cache=None,
+    overlay_candidates=None,
 ):
     """iteratively overlay 2d samples on top of eachother
 
@@ -586,6 +799,13 @@ def overlay(
             - if True, perform overlay
             - if False, do not perform overlay
             Default is `always_true`, perform overlay on all samples
+        overlay_cache: optional dictionary mapping overlay_df index values to
+            already-preprocessed sample data (see Overlay.precompute()). Cached
+            samples are used instead of re-running the preprocessing pipeline.
+            [default: None] preprocesses each overlayed sample when it is chosen
+        overlay_candidates: positional index of overlay_df used to choose
+            samples; the Overlay action builds this once per overlay_df.
+            [default: None] builds it from overlay_df on each call
 
     Returns:
         overlayed sample, (possibly updated) labels
@@ -605,133 +825,125 @@ def overlay(
     if not criterion_fn(sample):
         return sample  # no overlay, just return the original sample
 
+    if overlay_candidates is None:
+        overlay_candidates = _OverlayCandidates(overlay_df)
+
     ##  INPUT VALIDATION ##
-    assert (
-        overlay_class in ["different", None] or overlay_class in overlay_df.columns
-    ), (
-        "overlay_class must be 'different' or None or in overlay_df.columns. "
-        f"got {overlay_class}"
-    )
-    assert (overlay_prob <= 1) and (overlay_prob >= 0), (
-        "overlay_prob" f"should be in range (0,1), was {overlay_prob}"
+    # (only repeated when the arguments or the sample's label classes change)
+    overlay_candidates.validate(
+        overlay_class, overlay_prob, overlay_weight, sample.labels
     )
 
-    weight_error = f"overlay_weight should be between 0 and 1, was {overlay_weight}"
-
-    if hasattr(overlay_weight, "__iter__"):
-        assert (
-            len(overlay_weight) == 2
-        ), "must provide a float or a range of min,max values for overlay_weight"
-        assert (
-            overlay_weight[1] > overlay_weight[0]
-        ), "second value must be greater than first for overlay_weight"
-        for w in overlay_weight:
-            assert w < 1 and w > 0, weight_error
-    else:
-        assert overlay_weight < 1 and overlay_weight > 0, weight_error
-
-    if overlay_class is not None:
-        assert (
-            len(overlay_df.columns) > 0
-        ), "overlay_df must have labels if overlay_class is specified"
-        if overlay_class != "different":  # user specified a single class
-            assert (
-                overlay_df[overlay_class].sum() > 0
-            ), "overlay_df did not contain positive labels for overlay_class"
-
-    if len(overlay_df.columns) > 0 and sample.labels is not None:
-        assert list(overlay_df.columns) == list(
-            sample.labels.index
-        ), "overlay_df mast have same columns as sample's _labels or no columns"
-
     ## OVERLAY ##
     # iteratively perform overlays until stopping condition
     # each time, there is an overlay_prob probability of another overlay
     # up to a max number of max_overlay_num overlays
+    # all random draws for this sample are made at once: the number of overlays
+    # is the number of consecutive successful draws
+    draws = np.random.random_sample(max_overlay_num) < overlay_prob
+    n_overlays = max_overlay_num if draws.all() else int(np.argmin(draws))
+
+    # Select weight of each overlay; <0.5 means more emphasis on original sample
+    # Supports uniform-random selection from a range of weights eg [0.1,0.7]
+    if hasattr(overlay_weight, "__iter__"):
+        weights = np.random.uniform(overlay_weight[0], overlay_weight[1], n_overlays)
+    else:
+        weights = np.full(n_overlays, overlay_weight)
+
     overlays_performed = 0
 
-    while overlay_prob > np.random.uniform() and overlays_performed < max_overlay_num:
+    while overlays_performed < n_overlays:
         try:
             # lets pick a sample based on rules
             if overlay_class is None:
                 # choose any file from the overlay_df
-                overlay_path = random.choice(overlay_df.index)
+                candidate_idx = np.random.randint(len(overlay_candidates.paths))
 
             elif overlay_class == "different":
                 # Select a random file containing none of the classes this file contains
                 # because the overlay_df might be huge and sparse, we randomly
                 # choose row until one fits criterea rather than filtering overlay_df
-                # TODO: revisit this choice
-                good_choice = False
+                # candidates are drawn and checked in small batches, with one
+                # vectorized label intersection per batch
+                sample_labels = _binary_labels(sample.labels)
+                n_rows = len(overlay_candidates.paths)
+                candidate_idx = None
                 attempt_counter = 0
                 max_attempts = 100  # if we try this many times, raise error
-                while (not good_choice) and (attempt_counter < max_attempts):
-                    attempt_counter += 1
-
-                    # choose a random sample from the overlay df
-                    candidate_idx = random.randint(0, len(overlay_df) - 1)
-
-                    # check if this candidate sample has zero overlapping labels
-                    label_intersection = np.logical_and(
-                        overlay_df.values[candidate_idx, :], sample.labels.values
-                    )
-                    good_choice = sum(label_intersection) == 0
-
-                if not good_choice:  # tried max_attempts samples, none worked
+                while candidate_idx is None and attempt_counter < max_attempts:
+                    n_draws = min(32, max_attempts - attempt_counter)
+                    attempt_counter += n_draws
+
+                    # choose random samples from the overlay df
+                    candidates = np.random.randint(0, n_rows, size=n_draws)
+
+                    # check which candidates have zero overlapping labels
+                    overlapping = (
+                        overlay_candidates.labels[candidates] & sample_labels
+                    ).any(axis=1)
+                    good_choices = np.flatnonzero(~overlapping)
+                    if len(good_choices) > 0:
+                        candidate_idx = candidates[good_choices[0]]
+
+                if candidate_idx is None:  # tried max_attempts samples, none worked
                     raise ValueError(
                         f"No samples found with non-overlapping labels after {max_attempts} random draws"
                     )
 
-                overlay_path = overlay_df.index[candidate_idx]
-
             else:
-                # Select a random file from a class of choice (may be slow -
-                # however, in the case of a fixed overlay class, we could
-                # pass an overlay_df containing only that class)
-                choose_from = overlay_df[overlay_df[overlay_class] == 1]
-                overlay_path = np.random.choice(choose_from.index.values)
+                # Select a random file from a class of choice
+                rows = overlay_candidates.class_rows[overlay_class]
+                candidate_idx = rows[np.random.randint(len(rows))]
 
-            # now we have picked a file to overlay (overlay_path)
+            # now we have picked a file to overlay (row candidate_idx of overlay_df)
             # we also know its labels, if we need them
-            overlay_sample = AudioSample.from_series(overlay_df.loc[overlay_path])
-
-            # now we need to run the pipeline to do everything up until the Overlay step
-            # create a preprocessor for loading the overlay samples
-            # note that if there are multiple Overlay objects in a pipeline,
-            # it will cut off the preprocessing of the overlayed sample before
-            # the first Overlay object. This may or may not be the desired behavior,
-            # but it will at least "work".
-            overlay_sample = sample.preprocessor.forward(
-                overlay_sample, break_on_type=Overlay
-            )
+            overlay_path = overlay_candidates.paths[candidate_idx]
+            overlay_labels = overlay_candidates.labels[candidate_idx]
 
-            # the overlay_sample may have a different shape than the original sample
+            if overlay_cache is not None and overlay_path in overlay_cache:
+                # this sample was already preprocessed by Overlay.precompute()
+                # (the cached data is not modified by blending below)
+                overlay_data = overlay_cache[overlay_path]
+            else:
+                # now we need to run the pipeline to do everything up until the Overlay step
+                # create a preprocessor for loading the overlay samples
+                # note that if there are multiple Overlay objects in a pipeline,
+                # it will cut off the preprocessing of the overlayed sample before
+                # the first Overlay object. This may or may not be the desired behavior,
+                # but it will at least "work".
+                overlay_data = sample.preprocessor.forward(
+                    AudioSample.from_series(overlay_df.iloc[candidate_idx]),
+                    break_on_type=Overlay,
+                ).data
+
+            # the overlay sample may have a different shape than the original sample
             # force them into the same shape so we can overlay
-            if overlay_sample.data.shape != sample.data.shape:
-                overlay_sample.data = torchvision.transforms.Resize(
-                    sample.data.shape[1:]
-                )(overlay_sample.data)
+            if overlay_data.shape != sample.data.shape:
+                overlay_data = torchvision.transforms.Resize(sample.data.shape[1:])(
+                    overlay_data
+                )
 
             # now we blend the two tensors together with a weighted average
-            # Select weight of overlay; <0.5 means more emphasis on original sample
-            # Supports uniform-random selection from a range of weights eg [0.1,0.7]
-            weight = overlay_weight
-            if hasattr(weight, "__iter__"):
-                assert len(weight) == 2, (
-                    f"overlay_weight must specify a single value or range of 2 values, "
-                    f"got {overlay_weight}"
-                )
-                weight = random.uniform(weight[0], weight[1])
+            weight = float(weights[overlays_performed])
 
             # use a weighted sum to overlay (blend) the samples (arrays or tensors)
-            sample.data = sample.data * (1 - weight) + overlay_sample.data * weight
+            # for tensors, lerp_ computes x + weight * (x2 - x) = x*(1-w) + x2*w
+            # in-place, in a single pass over the sample's data
+            if isinstance(sample.data, torch.Tensor):
+                sample.data.lerp_(overlay_data.to(sample.data.dtype), weight)
+            else:
+                sample.data = sample.data * (1 - weight) + overlay_data * weight
 
             # update the labels with new classes
-            if update_labels and len(overlay_sample.labels) > 0:
+            if update_labels and len(overlay_labels) > 0:
                 # update labels as union of both files' labels
-                sample.labels.values[:] = np.logical_or(
-                    sample.labels.values, overlay_sample.labels.values
-                ).astype(int)
+                # creates new labels rather than modifying sample.labels in-place,
+                # since the original labels may share memory with the label df
+                labels = sample.labels
+                union = np.bitwise_or(_binary_labels(labels), overlay_labels)
+                sample.labels = pd.Series(
+                    union.astype(labels.dtype), index=labels.index, name=labels.name
+                )
 
             # overlay was successful, update count:
             overlays_performed += 1
@@ -739,6 +951,7 @@ def overlay(
         except PreprocessingError as ex:
             # don't try to load this sample again: remove from overlay df
             overlay_df = overlay_df.drop(overlay_path)
+            overlay_candidates = _OverlayCandidates(overlay_df)
             warnings.warn(f"Invalid overlay sample: {overlay_path}")
             if len(overlay_df) < 1:
                 raise ValueError("tried all overlay_df samples, none were safe") from ex
@@ -5,56 +5,75 @@ Augmentations and transforms for torch.Tensors
 
 import random
 
+import torch
 
-def freq_mask(spec, F=30, max_masks=3, replace_with_zero=False):
-    """draws horizontal bars over the image
+
+def _mask_along_axis(spec, max_width, max_masks, axis, replace_with_zero):
+    """draw random bars spanning one axis of a batch of image-like tensors
+
+    Mask widths and offsets are drawn independently for each sample in the
+    batch, and all bars are applied with a single broadcasted operation.
 
     Args:
-        spec: a torch.Tensor representing a spectrogram
-        F: maximum frequency-width of bars in pixels
+        spec: torch.Tensor of shape (batch, channels, height, width)
+        max_width: maximum width of bars in pixels along `axis`
         max_masks: maximum number of bars to draw
+        axis: 2 for horizontal (frequency) bars, 3 for vertical (time) bars
         replace_with_zero: if True, bars are 0s, otherwise, mean img value
 
     Returns:
-        Augmented tensor
+        Augmented tensor (a new tensor; `spec` is not modified)
     """
-    cloned = spec.clone()
-    batch_size = cloned.shape[0]
-    num_mel_channels = cloned.shape[2]
-
+    batch_size = spec.shape[0]
+    length = spec.shape[axis]
     num_masks = random.randint(1, max_masks)
 
-    for _ in range(num_masks):
+    # per-sample, per-bar widths in [0, max_width] and start offsets
+    # chosen such that each bar fits inside the image
+    width = torch.randint(
+        0, min(max_width, length) + 1, (batch_size, num_masks), device=spec.device
+    )
+    start = (
+        torch.rand(batch_size, num_masks, device=spec.device) * (length - width + 1)
+    ).long()
+
+    # (batch, length) boolean mask: True where any bar covers the position
+    positions = torch.arange(length, device=spec.device)
+    mask = (
+        (positions >= start[..., None]) & (positions < (start + width)[..., None])
+    ).any(dim=1)
+    shape = [batch_size, 1, 1, 1]
+    shape[axis] = length
+    mask = mask.view(shape)
+
+    if replace_with_zero:
+        return spec.masked_fill(mask, 0.0)
+    mask_value = spec.mean(dim=(1, 2, 3), keepdim=True)
+    return torch.where(mask, mask_value, spec)
 
-        f = [random.randrange(0, F) for _ in range(batch_size)]
-        f_zero = [
-            random.randrange(0, num_mel_channels - f[i])
-            for i, _ in enumerate(range(batch_size))
-        ]
 
-        mask_end = [
-            random.randrange(f_zero[i], f_zero[i] + f[i])
-            if f_zero[i] != (f_zero[i] + f[i])
-            else (f_zero[i] + F)
-            for i, _ in enumerate(range(batch_size))
-        ]
-
-        if replace_with_zero:
-            mask_value = [0.0] * batch_size
-        else:
-            mask_value = cloned.mean(dim=(1, 2, 3))
+def freq_mask(spec, F=30, max_masks=3, replace_with_zero=False):
+    """draws horizontal bars over the image
 
-        for i in range(len(cloned)):
-            cloned[i, :, f_zero[i] : mask_end[i], :] = mask_value[i]
+    Args:
+        spec: a torch.Tensor representing a batch of spectrograms
+            with shape (batch, channels, frequency, time)
+        F: maximum frequency-width of bars in pixels
+        max_masks: maximum number of bars to draw
+        replace_with_zero: if True, bars are 0s, otherwise, mean img value
 
-    return cloned
+    Returns:
+        Augmented tensor
+    """
+    return _mask_along_axis(spec, F, max_masks, 2, replace_with_zero)
 
 
 def time_mask(spec, T=40, max_masks=3, replace_with_zero=False):
     """draws vertical bars over the image
 
     Args:
-        spec: a torch.Tensor representing a spectrogram
+        spec: a torch.Tensor representing a batch of spectrograms
+            with shape (batch, channels, frequency, time)
         T: maximum time-width of bars in pixels
         max_masks: maximum number of bars to draw
         replace_with_zero: if True, bars are 0s, otherwise, mean img value
@@ -62,33 +81,4 @@ def time_mask(spec, T=40, max_masks=3, replace_with_zero=False):
     Returns:
         Augmented tensor
     """
-    cloned = spec.clone()
-    batch_size = cloned.shape[0]
-    len_spectro = cloned.shape[3]
-
-    num_masks = random.randint(1, max_masks)
-
-    for _ in range(num_masks):
-
-        t = [random.randrange(0, T) for _ in range(batch_size)]
-        t_zero = [
-            random.randrange(0, len_spectro - t[i])
-            for i, _ in enumerate(range(batch_size))
-        ]
-
-        mask_end = [
-            random.randrange(t_zero[i], t_zero[i] + t[i])
-            if t_zero[i] != (t_zero[i] + t[i])
-            else (t_zero[i] + T)
-            for i, _ in enumerate(range(batch_size))
-        ]
-
-        if replace_with_zero:
-            mask_value = [0.0] * batch_size
-        else:
-            mask_value = cloned.mean(dim=(1, 2, 3))
-
-        for i in range(len(cloned)):
-            cloned[i, :, :, t_zero[i] : mask_end[i]] = mask_value[i]
-
-    return cloned
+    return _mask_along_axis(spec, T, max_masks, 3, replace_with_zero)
@@ -1,6 +1,7 @@
 """Utilities for preprocessing"""
 import copy
 import inspect
+from functools import lru_cache
 from matplotlib import pyplot as plt
 import matplotlib
 
@@ -9,19 +10,28 @@ class PreprocessingError(Exception):
     """Custom exception indicating that a Preprocessor pipeline failed"""
 
 
+@lru_cache(maxsize=None)
+def _signature_defaults(func):
+    """tuple of (argument name, default value) pairs for a function
+
+    cached because inspect.signature is slow, and Actions are created often
+    (e.g. once per Action per DataLoader worker)
+    """
+    signature = inspect.signature(func)
+    return tuple((k, v.default) for k, v in signature.parameters.items())
+
+
 def get_args(func):
     """get list of arguments and default values from a function"""
-    signature = inspect.signature(func)
-    return {k: v.default for k, v in signature.parameters.items()}
+    return dict(_signature_defaults(func))
 
 
 def get_reqd_args(func):
     """get list of required arguments and default values from a function"""
-    signature = inspect.signature(func)
     return [
         k
-        for k, v in signature.parameters.items()
-        if v.default is inspect.Parameter.empty
+        for k, default in _signature_defaults(func)
+        if default is inspect.Parameter.empty
     ]
 
 
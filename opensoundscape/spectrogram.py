@@ -3,8 +3,10 @@
 """
 import warnings
 import os
+from functools import lru_cache
 
 import scipy
+import scipy.sparse
 import numpy as np
 import librosa.filters
 import skimage.transform
@@ -18,6 +20,174 @@ from opensoundscape.audio import Audio
 from opensoundscape.utils import min_max_scale, linear_scale
 
 
+@lru_cache(maxsize=32)
+def _get_window(window_type, window_samples):
+    """cached, read-only scipy.signal.get_window(window_type, window_samples)"""
+    window = scipy.signal.get_window(window_type, window_samples)
+    window.setflags(write=False)
+    return window
+
+
+@lru_cache(maxsize=32)
+def _mel_filter_bank(sample_rate, n_fft, n_mels, norm, htk):
+    """cached, read-only mel filter bank normalized so that rows sum to 1 on average
+
+    Each mel band is a narrow triangle, so most of the filter bank is zero.
+    It is returned as a sparse CSR array, so that applying it to a spectrogram
+    only multiplies the nonzero weights.
+
+    see librosa.filters.mel for arguments
+    """
+    filter_bank = librosa.filters.mel(
+        sr=sample_rate, n_fft=n_fft, n_mels=n_mels, norm=norm, htk=htk
+    )
+    # normalize filter bank: rows should sum to 1
+    fb_constant = np.sum(filter_bank, 1).mean()
+    filter_bank = scipy.sparse.csr_array(filter_bank / fb_constant)
+    filter_bank.data.setflags(write=False)
+    return filter_bank
+
+
+def _power_spectrogram(
+    samples,
+    sample_rate,
+    window_type,
+    window_samples,
+    overlap_samples,
+    fft_size,
+    scaling,
+):
+    """compute a power spectrogram from framed real FFTs
+
+    Gives the same result as scipy.signal.spectrogram with its default
+    mode='psd' and detrend='constant', but works directly on a strided view
+    of the samples and takes |X|^2 of the real FFT without the intermediate
+    complex products and copies made by scipy's general-purpose helper.
+
+    Args:
+        samples: 1d array of audio samples
+        sample_rate: sample rate of samples (Hz)
+        window_type, window_samples, overlap_samples, fft_size, scaling:
+            see Spectrogram.from_audio()
+
+    Returns:
+        frequencies, times, spectrogram (shape [frequencies, times])
+    """
+    samples = np.asarray(samples)
+    if samples.size == 0:
+        return np.empty(samples.shape), np.empty(samples.shape), np.empty(samples.shape)
+
+    # parse window, as scipy.signal.spectrogram does
+    if isinstance(window_type, (str, tuple)):
+        if window_samples > len(samples):
+            warnings.warn(
+                f"window_samples={window_samples} is greater than the number of "
+                f"samples ({len(samples)}), using window_samples={len(samples)}"
+            )
+            window_samples = len(samples)
+        window = _get_window(window_type, window_samples)
+    else:
+        window = np.asarray(window_type)
+        if window.ndim != 1 or len(window) != window_samples:
+            raise ValueError("window must be 1-D with length window_samples")
+
+    if fft_size is None:
+        fft_size = window_samples
+    elif fft_size < window_samples:
+        raise ValueError("fft_size must be greater than or equal to window_samples")
+    fft_size = int(fft_size)
+    if overlap_samples >= window_samples:
+        raise ValueError("overlap_samples must be less than window_samples")
+    step = window_samples - overlap_samples
+
+    # compute in float32 for float32 audio, as scipy does
+    dtype = np.result_type(samples.dtype, np.float32)
+    window = window.astype(dtype)
+    if scaling == "density":
+        scale = 1.0 / (sample_rate * (window * window).sum())
+    elif scaling == "spectrum":
+        scale = 1.0 / window.sum() ** 2
+    else:
+        raise ValueError(f"Unknown scaling: {scaling!r}")
+
+    # (n_frames, window_samples) view of the samples, without copying. Only
+    # whole frames are taken, so trailing samples that don't fill one are ignored
+    frames = np.lib.stride_tricks.sliding_window_view(samples, window_samples)[::step]
+
+    # remove the mean of each frame and apply the window
+    frames = frames - frames.mean(axis=1, keepdims=True, dtype=dtype)
+    frames *= window
+
+    # power of the one-sided FFT of each frame
+    fft = scipy.fft.rfft(frames, n=fft_size, axis=1, overwrite_x=True)
+    spectrogram = np.square(fft.real)
+    spectrogram += np.square(fft.imag)
+    spectrogram *= scale
+    # double the power of bins whose negative frequency was discarded,
+    # excluding the unpaired Nyquist bin if fft_size is even
+    if fft_size % 2:
+        spectrogram[:, 1:] *= 2
+    else:
+        spectrogram[:, 1:-1] *= 2
+
+    frequencies = scipy.fft.rfftfreq(fft_size, 1 / sample_rate)
+    times = np.arange(
+        window_samples / 2, len(samples) - window_samples / 2 + 1, step
+    ) / float(sample_rate)
+
+    return frequencies, times, spectrogram.T
+
+
+def _to_decibels(power):
+    """convert (non-negative) power values to decibels, 10*log10(power)
+
+    values of 0 become -np.inf. The result has the same dtype as `power`
+    """
+    # log10(0) is -inf; silence the divide-by-zero RuntimeWarning rather than
+    # masking zeros, which would need a separate -inf filled output array
+    with np.errstate(divide="ignore"):
+        decibels = np.log10(power)
+    decibels *= 10  # in place, rather than allocating another array
+    return decibels
+
+
+def _closest_index(values, x):
+    """find the index of the element of a sorted array closest to x
+
+    Equivalent to np.abs(values - x).argmin() (ties go to the lower index),
+    but uses a binary search rather than scanning the whole array
+
+    Args:
+        values: 1d array sorted in increasing order, eg Spectrogram.times
+        x: value to find
+
+    Returns:
+        index of the element of `values` closest to x
+    """
+    i = np.searchsorted(values, x)
+    if i == 0:
+        return 0
+    if i == len(values):
+        return len(values) - 1
+    return i - 1 if x - values[i - 1] <= values[i] - x else i
+
+
+@lru_cache(maxsize=16)
+def _colormap_lut(colormap):
+    """cached, read-only table of the RGBA colors of a matplotlib colormap
+
+    Args:
+        colormap: name of a matplotlib colormap, eg 'jet'
+
+    Returns:
+        array of shape (N, 4) with the colormap's N colors
+    """
+    cmap = matplotlib.colormaps[colormap]
+    lut = cmap(np.arange(cmap.N))
+    lut.setflags(write=False)
+    return lut
+
+
 class Spectrogram:
     """Immutable spectrogram container
 
@@ -122,10 +292,14 @@ class Spectrogram:
         fft_size=None,
         dB_scale=True,
         scaling="spectrum",
+        dtype=np.float32,
     ):
         """
         create a Spectrogram object from an Audio object
 
+        FFTs are computed with scipy.fft, so a faster backend such as pyFFTW
+        can be used by wrapping calls in `scipy.fft.set_backend()`
+
         Args:
             audio: Audio object
             window_type="hann": see scipy.signal.spectrogram docs
@@ -146,7 +320,9 @@ class Spectrogram:
             dB_scale: If True, rescales values to decibels, x=10*log10(x)
             scaling="spectrum": ("spectrum" or "density")
                 see scipy.signal.spectrogram docs
-
+            dtype: floating point type of the spectrogram values. The audio
+                samples are converted to this type before computing the FFT
+                [default: np.float32]
 
         Returns:
             opensoundscape.spectrogram.Spectrogram object
@@ -180,24 +356,20 @@ class Spectrogram:
             overlap_samples = int(window_samples * overlap_fraction)
         # else: use the provided overlap_samples argument
 
-        frequencies, times, spectrogram = scipy.signal.spectrogram(
-            x=audio.samples,
-            fs=audio.sample_rate,
-            window=window_type,
-            nperseg=int(window_samples),
-            noverlap=int(overlap_samples),
-            nfft=fft_size,
+        frequencies, times, spectrogram = _power_spectrogram(
+            samples=np.ascontiguousarray(audio.samples, dtype=dtype),
+            sample_rate=audio.sample_rate,
+            window_type=window_type,
+            window_samples=int(window_samples),
+            overlap_samples=int(overlap_samples),
+            fft_size=fft_size,
             scaling=scaling,
         )
 
         # convert to decibels
         # -> avoid RuntimeWarning by setting negative or 0 values to -np.inf
         if dB_scale:
-            spectrogram = 10 * np.log10(
-                spectrogram,
-                where=spectrogram > 0,
-                out=np.full(spectrogram.shape, -np.inf),
-            )
+            spectrogram = _to_decibels(spectrogram)
 
             # # limit the decibel range (-100 to -20 dB by default)
             # min_db, max_db = decibel_limits
@@ -216,6 +388,31 @@ class Spectrogram:
         )
         return new_obj
 
+    @classmethod
+    def from_audio_batch(cls, audio_list, num_workers=1, **kwargs):
+        """create a spectrogram from each of a list of Audio objects
+
+        Spectrograms are computed in parallel threads: the FFTs and array
+        operations in from_audio release the GIL, so threads scale across
+        cores without the cost of starting processes.
+
+        Args:
+            audio_list: list of Audio objects
+            num_workers: number of threads [default: 1]. -1 uses all cores.
+            **kwargs: passed to .from_audio() for each Audio object
+
+        Returns:
+            list of spectrogram objects, in the same order as audio_list
+        """
+        if num_workers == 1:
+            return [cls.from_audio(audio, **kwargs) for audio in audio_list]
+
+        from joblib import Parallel, delayed
+
+        return Parallel(n_jobs=num_workers, prefer="threads")(
+            delayed(cls.from_audio)(audio, **kwargs) for audio in audio_list
+        )
+
     def __setattr__(self, name, value):
         raise AttributeError("Spectrogram's cannot be modified")
 
@@ -266,7 +463,7 @@ class Spectrogram:
         """get start times of each window, rather than midpoint times"""
         window_length = self.window_length
         if window_length is not None:
-            return np.array(self.times) - window_length / 2
+            return self.times - window_length / 2
 
     def min_max_scale(self, feature_range=(0, 1)):
         """
@@ -368,30 +565,37 @@ class Spectrogram:
             bandpassed spectrogram object
 
         """
-
-        if min_f >= max_f:
-            raise ValueError(
-                f"min_f must be less than max_f (got min_f {min_f}, max_f {max_f}"
-            )
+        rows = self._frequency_band_rows(min_f, max_f)
 
         if not out_of_bounds_ok:
             # self.frequencies fully coveres the spec's frequency range
-            if min_f < min(self.frequencies) or max_f > max(self.frequencies):
+            if min_f < self.frequencies.min() or max_f > self.frequencies.max():
                 raise ValueError(
                     "with out_of_bounds_ok=False, min_f and max_f must fall"
                     "inside the range of self.frequencies"
                 )
 
-        # find indices of the frequencies in spec_freq closest to min_f and max_f
-        lowest_index = np.abs(self.frequencies - min_f).argmin()
-        highest_index = np.abs(self.frequencies - max_f).argmin()
-
         # take slices of the spectrogram and spec_freq that fall within desired range
         return self._spawn(
-            spectrogram=self.spectrogram[lowest_index : highest_index + 1, :],
-            frequencies=self.frequencies[lowest_index : highest_index + 1],
+            spectrogram=self.spectrogram[rows, :],
+            frequencies=self.frequencies[rows],
         )
 
+    def _frequency_band_rows(self, min_f, max_f):
+        """slice of the rows kept by .bandpass(min_f, max_f)
+
+        Lowest and highest row kept are those with frequencies closest to min_f and max_f
+        """
+        if min_f >= max_f:
+            raise ValueError(
+                f"min_f must be less than max_f (got min_f {min_f}, max_f {max_f}"
+            )
+
+        # find indices of the frequencies in spec_freq closest to min_f and max_f
+        lowest_index = _closest_index(self.frequencies, min_f)
+        highest_index = _closest_index(self.frequencies, max_f)
+        return slice(lowest_index, highest_index + 1)
+
     def trim(self, start_time, end_time):
         """extract a time segment from a spectrogram
 
@@ -407,8 +611,8 @@ class Spectrogram:
         """
 
         # find indices of the times in self.times closest to min_t and max_t
-        lowest_index = np.abs(self.times - start_time).argmin()
-        highest_index = np.abs(self.times - end_time).argmin()
+        lowest_index = _closest_index(self.times, start_time)
+        highest_index = _closest_index(self.times, end_time)
 
         # take slices of the spectrogram and spec_freq that fall within desired range
         return self._spawn(
@@ -452,7 +656,7 @@ class Spectrogram:
             else:
                 plt.show()
 
-    def amplitude(self, freq_range=None):
+    def amplitude(self, freq_range=None, out=None):
         """create an amplitude vs time signal from spectrogram
 
         by summing pixels in the vertical dimension
@@ -460,15 +664,19 @@ class Spectrogram:
         Args
             freq_range=None: sum Spectrogrm only in this range of [low, high] frequencies in Hz
             (if None, all frequencies are summed)
+            out=None: optionally, an array of shape (len(self.times),) to write the
+                result into, eg a buffer reused across repeated calls
 
         Returns:
             a time-series array of the vertical sum of spectrogram value
 
         """
         if freq_range is None:
-            return np.sum(self.spectrogram, 0)
+            return np.sum(self.spectrogram, 0, out=out)
         else:
-            return np.sum(self.bandpass(freq_range[0], freq_range[1]).spectrogram, 0)
+            # sum the rows .bandpass() would keep, without creating a new Spectrogram
+            rows = self._frequency_band_rows(freq_range[0], freq_range[1])
+            return np.sum(self.spectrogram[rows], 0, out=out)
 
     def net_amplitude(
         self, signal_band, reject_bands=None
@@ -499,18 +707,27 @@ class Spectrogram:
         if not (reject_bands is None):
             # we sum up the sizes of the rejection bands (to not overweight signal_band)
             reject_bands = np.array(reject_bands)
-            reject_bands_total_bandwidth = sum(reject_bands[:, 1] - reject_bands[:, 0])
+            reject_bands_total_bandwidth = (
+                reject_bands[:, 1] - reject_bands[:, 0]
+            ).sum()
 
-            # subtract reject_band_amplitude
+            # sum the amplitude of all reject bands, reusing one buffer for each band
+            reject_bands_amplitude = np.zeros(
+                self.spectrogram.shape[1], dtype=self.spectrogram.dtype
+            )
+            band_amplitude = np.empty_like(reject_bands_amplitude)
             for reject_band in reject_bands:
-                reject_band_amplitude = self.amplitude(reject_band)
-                net_amplitude = net_amplitude - (
-                    reject_band_amplitude / reject_bands_total_bandwidth
+                reject_bands_amplitude += self.amplitude(
+                    reject_band, out=band_amplitude
                 )
 
+            # subtract reject_bands_amplitude
+            reject_bands_amplitude /= reject_bands_total_bandwidth
+            net_amplitude -= reject_bands_amplitude
+
             # negative signal shouldn't be kept, because it means reject was
             # stronger than signal. Zero it:
-            net_amplitude = [max(0, s) for s in net_amplitude]
+            np.maximum(net_amplitude, 0, out=net_amplitude)
 
         return net_amplitude
 
@@ -567,22 +784,31 @@ class Spectrogram:
         # rescale spec_range to [1, 0]
         # note the low values represent silence, so a silent img would be black
         # if plotted directly from these values.
-        array = linear_scale(self.spectrogram, in_range=range, out_range=(0, 1))
+        # flip up-down so that frequency increases from bottom to top. The
+        # subtraction creates a new (contiguous) array, so the remaining
+        # steps work in place on it
+        array = np.subtract(
+            self.spectrogram[::-1, :],
+            range[0],
+            dtype=np.result_type(self.spectrogram, np.float32),
+        )
+        array *= 1 / (range[1] - range[0])
 
         # clip values to [0,1]
-        array = np.clip(array, 0, 1)
-
-        # flip up-down so that frequency increases from bottom to top
-        array = array[::-1, :]
+        np.clip(array, 0, 1, out=array)
 
         # invert if desired
         if invert:
-            array = 1 - array
+            np.subtract(1, array, out=array)
 
         # apply colormaps
         if colormap is not None:  # apply a colormap to get RGB channels
-            cm = matplotlib.cm.get_cmap(colormap)
-            array = cm(array)
+            # look up colors in the colormap's table, as matplotlib does:
+            # values in [0,1] select entries 0 to N-1 of the table
+            lut = _colormap_lut(colormap)
+            lut_index = (array * len(lut)).astype(int)
+            np.clip(lut_index, 0, len(lut) - 1, out=lut_index)
+            array = lut[lut_index]
 
         # resize and change channel dims
         # if None, use original shape
@@ -595,11 +821,19 @@ class Spectrogram:
             if shape[1] is None:
                 shape[1] = np.shape(array)[1]
         out_shape = [shape[0], shape[1], channels]
-        array = skimage.transform.resize(array, out_shape)
+        if array.ndim == 2 and tuple(out_shape[:2]) == array.shape:
+            # no resizing needed: just copy the greyscale values to each channel
+            if channels == 1:
+                array = array[:, :, np.newaxis]
+            else:
+                array = np.repeat(array[:, :, np.newaxis], channels, axis=2)
+        else:
+            array = skimage.transform.resize(array, out_shape)
 
         if return_type == "pil":  # expected shape of input is [h,w,c]
             # use correct type for PIL.Image, and scale from 0-1 to 0-255
-            array = np.uint8(array * 255)
+            array *= 255
+            array = array.astype(np.uint8)
             if array.shape[-1] == 1:
                 # PIL doesnt like [x,y,1] shape, it wants [x,y] instead
                 # if there's only one channel
@@ -618,17 +852,22 @@ class Spectrogram:
         """return copy of object, replacing any desired fields from __slots__
 
         pass any desired updates as kwargs
+
+        Note: the new object skips the type and shape checks of __init__, since
+        its values are derived from this (already validated) object. Callers must
+        pass arrays with consistent shapes, eg slicing .spectrogram and .times together
         """
-        assert np.all([k in self.__slots__ for k in kwargs.keys()]), (
-            "only pass members of Audio.__slots__ to _spawn as kwargs! "
+        assert all(k in self.__slots__ for k in kwargs), (
+            "only pass members of Spectrogram.__slots__ to _spawn as kwargs! "
             f"slots: {self.__slots__}"
         )
-        # load the current values from each __slots__ key
-        slots = {key: self.__getattribute__(key) for key in self.__slots__}
-        # update any user-specified values
-        slots.update(kwargs)
-        # create new instance of the class
-        return self.__class__(**slots)
+        # create new instance of the class without calling __init__
+        new = object.__new__(self.__class__)
+        for key in self.__slots__:
+            # use updated value if provided, otherwise the current value
+            value = kwargs[key] if key in kwargs else self.__getattribute__(key)
+            super(Spectrogram, new).__setattr__(key, value)
+        return new
 
 
 class MelSpectrogram(Spectrogram):
@@ -666,6 +905,7 @@ class MelSpectrogram(Spectrogram):
         n_mels=64,
         norm="slaney",
         htk=False,
+        dtype=np.float32,
     ):
         """Create a MelSpectrogram object from an Audio object
 
@@ -705,6 +945,7 @@ class MelSpectrogram(Spectrogram):
                 small values blend rows from the original spectrogram.
             norm='slanley': mel filter bank normalization, see Librosa docs
             htk: use HTK mel-filter bank instead of Slaney, see Librosa docs [default: False]
+            dtype: floating point type of the spectrogram values [default: np.float32]
 
         Returns:
             opensoundscape.spectrogram.MelSpectrogram object
@@ -725,27 +966,19 @@ class MelSpectrogram(Spectrogram):
             fft_size=fft_size,
             dB_scale=False,
             scaling=scaling,
+            dtype=dtype,
         )
 
         # choose n_fft to ensure filterbank.size[1]==spectrogram.size[0]
         n_fft = int(linear_spec.spectrogram.shape[0] - 1) * 2
-        # Construct mel filter bank
-        filter_bank = librosa.filters.mel(
-            sr=audio.sample_rate, n_fft=n_fft, n_mels=n_mels, norm=norm, htk=htk
-        )
-        # normalize filter bank: rows should sum to 1
-        fb_constant = np.sum(filter_bank, 1).mean()
-        filter_bank = filter_bank / fb_constant
+        # Construct mel filter bank (cached, since it only depends on these arguments)
+        filter_bank = _mel_filter_bank(audio.sample_rate, n_fft, n_mels, norm, htk)
 
         # Apply filter bank to spectrogram with matrix multiplication
-        melspectrogram = np.dot(filter_bank, linear_spec.spectrogram)
+        melspectrogram = filter_bank @ linear_spec.spectrogram
 
         if dB_scale:  # convert to decibels
-            melspectrogram = 10 * np.log10(
-                melspectrogram,
-                where=melspectrogram > 0,
-                out=np.full(melspectrogram.shape, -np.inf),
-            )
+            melspectrogram = _to_decibels(melspectrogram)
 
             # limit the decibel range (-100 to -20 dB by default)
             # values below lower limit set to lower limit,
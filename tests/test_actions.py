@@ -10,6 +10,7 @@ from opensoundscape.preprocess import actions
 from opensoundscape.sample import AudioSample
 from PIL import Image
 import torch
+import torchvision
 from opensoundscape.spectrogram import Spectrogram
 
 ## Fixtures: prepare objects that can be used by tests ##
@@ -226,6 +227,20 @@ def test_scale_tensor(tensor):
     assert np.array_equal(tensor.numpy(), result.numpy())
 
 
+def test_scale_tensor_values(tensor):
+    result = actions.scale_tensor(tensor, input_mean=0.5, input_std=0.25)
+    assert torch.allclose(result, (tensor - 0.5) / 0.25)
+    assert not torch.equal(result, tensor)  # input is not modified in-place
+
+
+def test_scale_tensor_per_channel():
+    tensor = torch.rand(3, 5, 6)
+    mean, std = [0.485, 0.456, 0.406], [0.229, 0.224, 0.225]
+    result = actions.scale_tensor(tensor, input_mean=mean, input_std=std)
+    expected = torchvision.transforms.Normalize(mean, std)(tensor)
+    assert torch.allclose(result, expected, atol=1e-6)
+
+
 def test_generic_action(sample, tensor):
     """should be able to provide function to Action plus kwargs"""
     sample.data = tensor
@@ -256,3 +271,152 @@ def test_modify_parameter_with_series_magic(tensor):
     action.params.input_mean = 1  # set with . syntax
     assert action.params["input_mean"] == 1
     action.go(tensor)
+
+
+def test_time_and_frequency_mask(tensor):
+    """bars span the full height (time) or width (frequency) of each sample"""
+    for mask_fn, reduce_dim in ((actions.time_mask, 1), (actions.frequency_mask, 2)):
+        result = mask_fn(tensor, max_masks=3, max_width=0.5)
+        assert result.shape == tensor.shape
+        masked = (result != tensor).all(dim=0).all(dim=reduce_dim - 1)
+        changed = (result != tensor).any(dim=0).any(dim=reduce_dim - 1)
+        assert torch.equal(masked, changed)
+
+
+def test_time_mask_batch():
+    """each sample in a batch is masked independently, with zeros if requested"""
+    from opensoundscape.preprocess import tensor_augment
+
+    batch = torch.rand(8, 1, 5, 40) + 1
+    result = tensor_augment.time_mask(batch, T=20, replace_with_zero=True)
+    assert result.shape == batch.shape
+    assert torch.all((result == 0) | (result == batch))
+    # the input batch is not modified
+    assert torch.all(batch > 0)
+    # masked time steps span all frequencies
+    zero_cols = (result == 0).all(dim=2)
+    assert torch.equal(zero_cols, (result == 0).any(dim=2))
+
+
+def test_overlay_candidates_follow_overlay_df():
+    df = pd.DataFrame(
+        index=["a.wav", "b.wav", "b.wav", "c.wav"],
+        data=[[1, 0], [0, 1], [0, 1], [1, 1]],
+        columns=["x", "y"],
+    )
+    action = actions.Overlay(overlay_df=df, update_labels=False)
+    candidates = action._overlay_candidates
+    assert list(candidates.paths) == ["a.wav", "b.wav", "c.wav"]
+    assert list(candidates.class_rows["x"]) == [0, 2]
+    assert list(candidates.class_rows["y"]) == [1, 2]
+    assert candidates.labels.dtype == np.uint8
+    assert candidates.labels.tolist() == [[1, 0], [0, 1], [1, 1]]
+
+    # replacing overlay_df re-builds the candidates
+    action.overlay_df = df.iloc[:1]
+    assert list(action._overlay_candidates.paths) == ["a.wav"]
+
+
+def test_random_affine(tensor):
+    """random affine re-uses the transform but draws new parameters per call"""
+    results = [
+        actions.torch_random_affine(tensor, translate=[0.5, 0.5]) for _ in range(5)
+    ]
+    assert all(r.shape == tensor.shape for r in results)
+    assert not all(torch.equal(results[0], r) for r in results[1:])
+
+
+def test_image_to_tensor():
+    img = Image.fromarray(np.uint8(np.random.uniform(0, 255, [10, 12])))
+    rgb = actions.image_to_tensor(img)
+    assert rgb.shape == (3, 10, 12)
+    assert rgb.min() >= 0 and rgb.max() <= 1
+    grey = actions.image_to_tensor(img, greyscale=True)
+    assert grey.shape == (1, 10, 12)
+    assert torch.allclose(grey[0], rgb[0])
+
+
+def test_tensor_add_noise():
+    tensor = torch.ones(3, 100, 100)
+    result = actions.tensor_add_noise(tensor, std=0.1)
+    assert torch.equal(tensor, torch.ones(3, 100, 100))  # input is not modified
+    assert math.isclose((result - tensor).std().item(), 0.1, rel_tol=0.05)
+    assert math.isclose(result.mean().item(), 1, abs_tol=0.01)
+
+
+def test_cast_tensor_half_precision_augmentations(tensor):
+    """tensor augmentations preserve reduced-precision dtypes"""
+    x = actions.cast_tensor(tensor, dtype=torch.bfloat16)
+    assert x.dtype == torch.bfloat16
+    for fn in (
+        actions.time_mask,
+        actions.frequency_mask,
+        actions.tensor_add_noise,
+        actions.scale_tensor,
+        actions.torch_random_affine,
+    ):
+        assert fn(x).dtype == torch.bfloat16
+
+
+def test_action_go_uses_current_params(sample, tensor):
+    """changes to params, made with set() or directly, are used by go()"""
+    action = actions.Action(actions.scale_tensor, input_mean=0, input_std=2)
+    action.params.input_std = 4
+    sample.data = tensor
+    action.go(sample)
+    assert torch.allclose(sample.data, tensor / 4)
+    sample.data = tensor
+    action.go(sample, input_std=1)  # kwargs override params
+    assert torch.allclose(sample.data, tensor)
+
+
+def test_overlay_number_of_overlays(sample):
+    """each overlay blends the cached overlay sample into the sample"""
+    overlay_df = pd.DataFrame(index=["a.wav"], data=[[1]], columns=["x"])
+    cache = {"a.wav": torch.ones(1, 4, 4)}
+    for prob, n, expected in [(1, 2, 0.75), (1, 1, 0.5), (0, 2, 0.0)]:
+        sample.data = torch.zeros(1, 4, 4)
+        actions.overlay(
+            sample,
+            overlay_df,
+            update_labels=False,
+            overlay_prob=prob,
+            max_overlay_num=n,
+            overlay_cache=cache,
+        )
+        assert torch.allclose(sample.data, torch.full((1, 4, 4), expected))
+
+
+def test_overlay_validates_changed_arguments(sample):
+    overlay_df = pd.DataFrame(index=["a.wav"], data=[[1, 0]], columns=["x", "y"])
+    candidates = actions._OverlayCandidates(overlay_df)
+    sample.data = torch.zeros(1, 4, 4)
+    sample.labels = pd.Series([0, 1], index=["x", "y"])
+    kwargs = dict(overlay_cache={"a.wav": torch.ones(1, 4, 4)})
+    kwargs.update(overlay_candidates=candidates)
+    actions.overlay(sample, overlay_df, False, **kwargs)
+    with pytest.raises(AssertionError):
+        actions.overlay(sample, overlay_df, False, overlay_weight=1.5, **kwargs)
+    with pytest.raises(AssertionError):  # no positive labels for class y
+        actions.overlay(sample, overlay_df, False, overlay_class="y", **kwargs)
+    sample.labels = pd.Series([0, 1], index=["x", "z"])
+    with pytest.raises(AssertionError):  # classes do not match overlay_df
+        actions.overlay(sample, overlay_df, False, **kwargs)
+
+
+def test_overlay_blends_tensor_in_place(sample):
+    """blending x*(1-w) + x2*w is performed in the sample's existing tensor"""
+    overlay_df = pd.DataFrame(index=["a.wav"], data=[[1]], columns=["x"])
+    x = torch.rand(1, 4, 4)
+    x2 = torch.rand(1, 4, 4)
+    sample.data = x.clone()
+    data_ptr = sample.data.data_ptr()
+    actions.overlay(
+        sample,
+        overlay_df,
+        update_labels=False,
+        overlay_weight=0.3,
+        overlay_cache={"a.wav": x2},
+    )
+    assert sample.data.data_ptr() == data_ptr
+    assert torch.allclose(sample.data, x * 0.7 + x2 * 0.3)
@@ -97,6 +97,14 @@ def test_load_raven_annotations_w_audio(raven_file):
     assert ba.df["audio_file"].values[0] == "audio_path"
 
 
+def test_load_raven_annotations_parallel(raven_file, raven_file_empty):
+    files = [raven_file, raven_file_empty, raven_file]
+    audio = ["a.wav", "b.wav", "c.wav"]
+    ba = BoxedAnnotations.from_raven_files(files, audio)
+    ba_parallel = BoxedAnnotations.from_raven_files(files, audio, num_workers=2)
+    pd.testing.assert_frame_equal(ba.df, ba_parallel.df)
+
+
 def test_load_raven_no_annotation_column(raven_file):
     a = BoxedAnnotations.from_raven_files([raven_file], annotation_column_idx=None)
     # we should now have a dataframe with a column "Species"
@@ -162,6 +170,23 @@ def test_to_raven_files(boxed_annotations, saved_raven_file):
     assert saved_raven_file.exists()
 
 
+def test_to_raven_files_multiple_files(boxed_annotations, save_path):
+    df = boxed_annotations.df.copy()
+    df.loc[0, "audio_file"] = "other_file.wav"
+    ba = BoxedAnnotations(df)
+    audio_files = ["audio_file.wav", "other_file.wav", "no_annotations.wav"]
+    ba.to_raven_files(save_path, audio_files=audio_files)
+    try:
+        lengths = [
+            len(pd.read_csv(save_path / f"{Path(f).stem}.selections.txt", sep="\t"))
+            for f in audio_files
+        ]
+        assert lengths == [2, 1, 0]
+    finally:
+        for f in audio_files:
+            (save_path / f"{Path(f).stem}.selections.txt").unlink()
+
+
 def test_subset(boxed_annotations):
     subset = boxed_annotations.subset(["a", None])
     assert len(subset.df) == 2
@@ -248,6 +273,23 @@ def test_one_hot_labels_like_overlap(boxed_annotations):
     assert np.array_equal(labels.values, np.array([[1, 1, 0, 0, 0]]).transpose())
 
 
+def test_one_hot_labels_like_multiple_files(boxed_annotations):
+    clip_df = generate_clip_times_df(5, clip_duration=1.0, clip_overlap=0)
+    clip_df = pd.concat([clip_df, clip_df])
+    clip_df["audio_file"] = ["audio_file.wav"] * 5 + ["other.wav"] * 5
+    clip_df = clip_df.set_index(["audio_file", "start_time", "end_time"])
+    with pytest.warns(UserWarning) as record:
+        labels = boxed_annotations.one_hot_labels_like(
+            clip_df,
+            class_subset=["a", "b"],
+            min_label_overlap=0.25,
+            warn_no_annotations=True,
+        )
+    assert len(record) == 1  # warns once for the file without annotations
+    assert np.array_equal(labels["a"].values, [1, 0, 0, 0, 0] + [0] * 5)
+    assert np.array_equal(labels["b"].values, [0, 0, 0, 1, 1] + [0] * 5)
+
+
 def test_one_hot_clip_labels(boxed_annotations):
     labels = boxed_annotations.one_hot_clip_labels(
         full_duration=5,
@@ -259,6 +301,21 @@ def test_one_hot_clip_labels(boxed_annotations):
     assert np.array_equal(labels.values, np.array([[1, 0, 0, 0, 0]]).transpose())
 
 
+def test_one_hot_clip_labels_nan_audio_file(boxed_annotations):
+    boxed_annotations.df["audio_file"] = np.nan
+    labels = boxed_annotations.one_hot_clip_labels(
+        full_duration=5,
+        clip_duration=1.0,
+        clip_overlap=0,
+        class_subset=["a", "b"],
+        min_label_overlap=0.25,
+        audio_files=[np.nan],
+    )
+    assert labels.index.get_level_values(0).isnull().all()
+    assert np.array_equal(labels["a"].values, [1, 0, 0, 0, 0])
+    assert np.array_equal(labels["b"].values, [0, 0, 0, 1, 1])
+
+
 def test_one_hot_clip_labels_get_duration(boxed_annotations, silence_10s_mp3_str):
     """should get duration of audio files if full_duration is None"""
     boxed_annotations.df["audio_file"] = [silence_10s_mp3_str] * len(
@@ -323,6 +380,30 @@ def test_convert_labels_wrong_type(boxed_annotations):
         boxed_annotations = boxed_annotations.convert_labels(df)
 
 
+def test_one_hot_labels_on_time_intervals_unsorted(boxed_annotations):
+    # intervals of different lengths, not sorted by start time
+    starts = [4.5, 0, 2, 0.9, 3]
+    ends = [10, 0.5, 2.5, 4, 3.1]
+    labels = annotations._one_hot_labels_on_time_intervals(
+        boxed_annotations.df,
+        class_subset=["a", "b"],
+        start_times=starts,
+        end_times=ends,
+        min_label_overlap=0.25,
+        min_label_fraction=None,
+    )
+    for row, start, end in zip(labels, starts, ends):
+        expected = annotations.one_hot_labels_on_time_interval(
+            boxed_annotations.df,
+            class_subset=["a", "b"],
+            start_time=start,
+            end_time=end,
+            min_label_overlap=0.25,
+        )
+        assert list(row) == list(expected.values())
+    assert np.array_equal(labels, [[0, 1], [1, 0], [0, 0], [0, 1], [0, 0]])
+
+
 def test_one_hot_labels_on_time_interval(boxed_annotations):
     a = annotations.one_hot_labels_on_time_interval(
         boxed_annotations.df,
@@ -433,6 +433,14 @@ def test_trim_samples(silence_10s_mp3_str):
         audio.trim_samples(20, 10)
 
 
+def test_trim_does_not_copy_samples(silence_10s_mp3_str):
+    """trimmed Audio objects share memory with the original samples"""
+    audio = Audio.from_file(silence_10s_mp3_str)
+    trimmed = audio.trim(1, 2)
+    assert trimmed.samples.dtype == np.float32
+    assert np.shares_memory(trimmed.samples, audio.samples)
+
+
 def test_trim_past_end_of_clip(silence_10s_mp3_str):
     """correct behavior is to trim to the end of the clip"""
     audio = Audio.from_file(silence_10s_mp3_str, sample_rate=10000).trim(9, 11)
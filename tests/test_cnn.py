@@ -85,6 +85,18 @@ def test_train_single_target(train_df):
     shutil.rmtree("tests/models/")
 
 
+def test_train_dataloader_keeps_workers_alive(train_df):
+    model = cnn.CNN(alexnet(2, weights=None), classes=[0, 1], sample_duration=5.0)
+    loader = model._init_train_dataloader(
+        train_df, batch_size=2, num_workers=1, raise_errors=False
+    )
+    assert loader.persistent_workers
+    loader = model._init_train_dataloader(
+        train_df, batch_size=2, num_workers=0, raise_errors=False
+    )
+    assert not loader.persistent_workers
+
+
 def test_train_multi_target(train_df):
     model = cnn.CNN("resnet18", classes=[0, 1], sample_duration=5.0)
     model.train(
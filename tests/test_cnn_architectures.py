@@ -1,5 +1,7 @@
 from opensoundscape.ml import cnn_architectures
 import pytest
+import torch
+import torchvision
 
 # test_cnn.py tests that all registered architectures are able to
 # predict on a sample (with modified input channels and output size)
@@ -97,3 +99,31 @@ def test_efficientnet_widese_b4():
 def test_noninteger_output_nodes():
     with pytest.raises(TypeError):
         arch = cnn_architectures.resnet101(4.5)
+
+
+def test_pretrained_model_is_copied(monkeypatch):
+    """models built from a cached pre-trained model should be independent"""
+    n_built = []
+
+    def fake_constructor(weights):
+        n_built.append(weights)
+        return torch.nn.Linear(3, 2)
+
+    monkeypatch.setattr(torchvision.models, "resnet18", fake_constructor)
+    cnn_architectures.clear_pretrained_model_cache()
+    try:
+        arch1 = cnn_architectures._load_torchvision_model("resnet18", "DEFAULT")
+        arch2 = cnn_architectures._load_torchvision_model("resnet18", "DEFAULT")
+        assert n_built == ["DEFAULT"]  # built once, then copied from the cache
+        assert arch1 is not arch2
+        assert torch.equal(arch1.weight, arch2.weight)
+        cnn_architectures.freeze_params(arch1)
+        assert arch2.weight.requires_grad
+    finally:
+        cnn_architectures.clear_pretrained_model_cache()
+
+
+def test_random_weights_not_cached():
+    arch1 = cnn_architectures.resnet18(2, weights=None)
+    arch2 = cnn_architectures.resnet18(2, weights=None)
+    assert not (arch1.conv1.weight == arch2.conv1.weight).all()
@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+import torch
 import pandas as pd
 from opensoundscape.preprocess.preprocessors import SpectrogramPreprocessor
 from opensoundscape.preprocess.utils import PreprocessingError
@@ -168,6 +169,15 @@ def test_overlay_update_labels(dataset_df, overlay_pre):
     assert np.array_equal(sample.labels.values, [1, 1])
 
 
+def test_overlay_update_labels_does_not_modify_label_df(dataset_df, overlay_pre):
+    dataset = AudioFileDataset(dataset_df, overlay_pre)
+    dataset.preprocessor.pipeline.overlay.set(update_labels=True)
+    sample = dataset[0]
+    assert np.array_equal(sample.labels.values, [1, 1])
+    assert sample.labels.name == dataset_df.index[0]
+    assert np.array_equal(dataset.label_df.values, [[1, 0], [0, 1]])
+
+
 def test_overlay_update_labels_duplicated_index(dataset_df, overlay_df):
     """duplicate indices of overlay_df are now removed, resolving
     a bug that caused duplicated indices to return 2-d labels.
@@ -224,3 +234,26 @@ def test_audio_splitting_dataset_overlap(dataset_df, pre):
 
     # load a sample
     dataset[17]
+
+
+def test_overlay_precompute(dataset_df, overlay_pre, overlay_df):
+    """cached overlay samples are used instead of re-running the pipeline"""
+    overlay_action = overlay_pre.pipeline.overlay
+    overlay_action.precompute(overlay_pre)
+    assert list(overlay_action.overlay_cache.keys()) == list(overlay_df.index)
+
+    # replace the cached sample with a constant tensor: blending with weight 0.5
+    # should give the average of the original sample and the constant
+    path = overlay_df.index[0]
+    cached = overlay_action.overlay_cache[path]
+    overlay_action.overlay_cache[path] = torch.ones_like(cached)
+    dataset = AudioFileDataset(dataset_df, overlay_pre)
+    # bypass other random actions so that the two outputs are comparable
+    for name in ["random_trim_audio", "time_mask", "frequency_mask", "add_noise"]:
+        overlay_pre.pipeline[name].bypass = True
+    overlay_pre.pipeline.random_affine.bypass = True
+    overlay_pre.pipeline.rescale.bypass = True
+    overlaid = dataset[0].data
+    overlay_pre.pipeline.overlay.bypass = True
+    original = dataset[0].data
+    assert torch.allclose(overlaid, original * 0.5 + 0.5)
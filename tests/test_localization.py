@@ -105,6 +105,17 @@ def test_soundfinder_nocenter():
     )
 
 
+def test_soundfinder_float32():
+    reciever_locations = [[0, 0, 0], [0, 20, 1], [20, 20, -1], [20, 0, 0.1]]
+    arrival_times = [1, 1, 1, 1]
+    estimate = localization.soundfinder_localize(
+        reciever_locations, arrival_times, dtype=np.float32
+    )
+    assert close(
+        np.linalg.norm(np.array(estimate[0:3]) - np.array([10, 10, 0])), 0, 0.1
+    )
+
+
 def test_gillette_localize_raises():
     reciever_locations = [[100, 0], [100, 20], [120, 20], [120, 0]]
     arrival_times = [1, 1, 1, 1]
@@ -148,6 +159,41 @@ def test_gillette_localize_3d():
         assert np.allclose(estimated_pos, sound_source, atol=2.5)
 
 
+def test_gillette_localize_reuses_geometry():
+    receiver_locations = np.array([[0, 0], [0, 20], [20, 20], [20, 0], [10, 10]])
+    tdoas = np.array([0, 0.01, 0.02, 0.01, 0.005])
+
+    localization._gillette_geometry.cache_clear()
+    localization.gillette_localize(receiver_locations, tdoas)
+    second = localization.gillette_localize(receiver_locations, tdoas * 0.5)
+    assert localization._gillette_geometry.cache_info().hits == 1
+
+    # cached result matches a fresh computation
+    localization._gillette_geometry.cache_clear()
+    assert np.allclose(
+        localization.gillette_localize(receiver_locations, tdoas * 0.5), second
+    )
+
+
+def test_localize_events():
+    receiver_locations = np.array([[0, 0], [0, 20], [20, 20], [20, 0], [10, 10]])
+    sources = np.array([[5, 5], [12, 3], [8, 16]])
+    arrival_times = []
+    for source in sources:
+        time_of_flight = np.linalg.norm(receiver_locations - source, axis=1) / 343
+        arrival_times.append(time_of_flight - np.min(time_of_flight))
+
+    estimates = localization.localize_events(
+        receiver_locations, arrival_times, algorithm="gillette", num_workers=2
+    )
+    assert len(estimates) == len(sources)
+    for estimate, arrival_time in zip(estimates, arrival_times):
+        assert np.allclose(
+            estimate,
+            localization.gillette_localize(receiver_locations, arrival_time),
+        )
+
+
 def test_soundfinder_nopseudo():
     reciever_locations = [[0, 0, 0], [0, 20, 1], [20, 20, -1], [20, 0, 0.1]]
     arrival_times = [1, 1, 1, 1]
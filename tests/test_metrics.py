@@ -21,6 +21,16 @@ def test_multitarget_metrics():
     assert np.isclose(out[0]["au_roc"], 0.75, 1e-5)
 
 
+def test_multitarget_metrics_map_uses_scores():
+    # all scores exceed the threshold, so binary predictions carry no ranking
+    # information, but the continuous scores do
+    x = [[0.2, 0.9], [0.4, 0.8], [0.3, 0.6], [0.1, 0.7]]
+    y = [[0, 1], [1, 0], [0, 1], [1, 0]]
+    out = metrics.multi_target_metrics(y, x, [0, 1], 0.5)
+    assert np.isclose(out["map"], 0.75, 1e-5)
+    assert np.isclose(out["au_roc"], 0.5, 1e-5)
+
+
 def test_singletarget_metrics():
     x = [[0, 1], [1, 0], [1, 0]]
     y = [[0, 1], [0, 1], [1, 0]]
@@ -72,3 +82,23 @@ def test_predict_single_target_labels():
     assert isinstance(metrics.predict_single_target_labels(scores), torch.Tensor)
     scores = pd.DataFrame(scores.numpy())
     assert isinstance(metrics.predict_single_target_labels(scores), pd.DataFrame)
+
+
+def test_label_metrics_matches_sklearn():
+    import sklearn.metrics as M
+
+    rng = np.random.default_rng(0)
+    targets = rng.integers(0, 2, (20, 4))
+    preds = rng.integers(0, 2, (20, 4))
+    preds[:, 0] = 0  # class with no predictions: precision is 0
+
+    out = metrics._label_metrics(targets, preds)
+    pre, rec, f1, support = M.precision_recall_fscore_support(
+        targets, preds, average=None, zero_division=0
+    )
+    assert np.allclose(out["precision"], pre)
+    assert np.allclose(out["recall"], rec)
+    assert np.allclose(out["f1"], f1)
+    assert np.array_equal(out["support"], support)
+    assert np.isclose(out["jaccard"], M.jaccard_score(targets, preds, average="macro"))
+    assert np.isclose(out["hamming_loss"], M.hamming_loss(targets, preds))
@@ -17,6 +17,29 @@ def test_apply_activation_layer():
     y = ml_utils.apply_activation_layer(x, "softmax")
     assert np.allclose(y, torch.tensor([[0.0900, 0.2447, 0.6652]]), atol=1e-4)
 
+    y = ml_utils.apply_activation_layer(x, "softmax_and_logit")
+    assert np.allclose(y, torch.tensor([[-2.3133, -1.1269, 0.6867]]), atol=1e-4)
+
+    # numpy arrays are accepted, and tensors are not copied
+    y = ml_utils.apply_activation_layer(x.numpy(), "sigmoid")
+    assert np.allclose(y, torch.tensor([[0.7311, 0.8808, 0.9526]]), atol=1e-4)
+    assert ml_utils.apply_activation_layer(x, None) is x
+
+    with pytest.raises(ValueError):
+        ml_utils.apply_activation_layer(x, "relu")
+
+
+def test_get_batch():
+    array = [1, 2, 3, 4, 5, 6, 7]
+    assert ml_utils.get_batch(array, 3, 0) == [1, 2, 3]
+    assert ml_utils.get_batch(array, 3, 2) == [7]
+
+    # arrays are sliced without copying
+    array = np.arange(7)
+    batch = ml_utils.get_batch(array, 3, 1)
+    assert np.array_equal(batch, [3, 4, 5])
+    assert np.shares_memory(batch, array)
+
 
 def test_collate_audio_samples_to_tensors():
     data = torch.tensor([[1, 2, 3], [4, 5, 6]])
@@ -27,3 +50,86 @@ def test_collate_audio_samples_to_tensors():
     assert batched_labels.shape == (4, 3)
     assert type(batched_data) == torch.Tensor
     assert type(batched_labels) == torch.Tensor
+
+
+class _LabelDataset(torch.utils.data.Dataset):
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, idx):
+        return torch.tensor(self.df.values[idx])
+
+
+def test_cas_dataloader():
+    df = pd.DataFrame({"a": [1, 0, 0, 1], "b": [0, 1, 0, 0], "c": [0, 0, 1, 0]})
+    loader = ml_utils.cas_dataloader(_LabelDataset(df), batch_size=2, num_workers=0)
+    assert len(list(loader)) == 3  # 2 samples of each of 3 classes
+
+    loader = ml_utils.cas_dataloader(_LabelDataset(df), batch_size=2, num_workers=1)
+    assert loader.persistent_workers
+    assert len(list(loader)) == 3
+
+    # digit labels are cached on the dataset while dataset.df is unchanged
+    dataset = _LabelDataset(df)
+    ml_utils.cas_dataloader(dataset, batch_size=2, num_workers=0)
+    assert np.array_equal(dataset._cas_digit_labels[1], [0, 1, 2, 0])
+    dataset.df = df.copy()
+    dataset.df.loc[3, ["a", "b"]] = [0, 1]
+    ml_utils.cas_dataloader(dataset, batch_size=2, num_workers=0)
+    assert np.array_equal(dataset._cas_digit_labels[1], [0, 1, 2, 1])
+
+    # multi-target labels are not supported
+    df.loc[0, "b"] = 1
+    with pytest.raises(AssertionError, match="1 samples had >1 label"):
+        ml_utils.cas_dataloader(_LabelDataset(df), batch_size=2, num_workers=0)
+
+    # each sample must have a label
+    df.loc[0, ["a", "b"]] = 0
+    with pytest.raises(AssertionError, match="1 samples had 0 labels"):
+        ml_utils.cas_dataloader(_LabelDataset(df), batch_size=2, num_workers=0)
+
+
+def test_scorecam_weights():
+    from pytorch_grad_cam.utils.model_targets import ClassifierOutputTarget
+
+    torch.manual_seed(0)
+    net = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 6, 3, stride=2, padding=1),
+        torch.nn.AdaptiveAvgPool2d(1),
+        torch.nn.Flatten(),
+        torch.nn.Linear(6, 2),
+    )
+    x = torch.rand(2, 3, 16, 20)
+    activations = net[0](x).detach().numpy()
+    cam = ml_utils.ScoreCAM(net, [net[0]])
+    cam.batch_size = 4
+    targets = [ClassifierOutputTarget(0), ClassifierOutputTarget(1)]
+    weights = cam.get_cam_weights(x, None, targets, activations, None)
+    assert weights.shape == (2, 6)
+    assert np.allclose(weights.sum(1), 1)
+
+    # targets that score one output at a time give the same result
+    single_targets = [lambda o: o[0], lambda o: o[1]]
+    weights2 = cam.get_cam_weights(x, None, single_targets, activations, None)
+    assert np.allclose(weights, weights2)
+
+    # activations can also be passed as a tensor
+    weights3 = cam.get_cam_weights(
+        x, None, targets, torch.from_numpy(activations), None
+    )
+    assert np.allclose(weights, weights3)
+
+    # channels_last models give the same weights
+    assert not ml_utils._uses_channels_last(net)
+    net = net.to(memory_format=torch.channels_last)
+    assert ml_utils._uses_channels_last(net)
+    weights4 = cam.get_cam_weights(x, None, targets, activations, None)
+    assert np.allclose(weights, weights4, atol=1e-6)
+
+    # reduced precision gives approximately the same weights
+    cam = ml_utils.ScoreCAM(net, [net[0]], use_amp=True)
+    weights_amp = cam.get_cam_weights(x, None, targets, activations, None)
+    assert np.allclose(weights, weights_amp, atol=1e-3)
@@ -39,3 +39,13 @@ def test_show_tensor_wrong_channel():
 def test_show_tensor_grid():
     tensors = [torch.empty((3, 224, 224)) for _ in range(12)]
     utils.show_tensor_grid(tensors, columns=3)
+
+
+def test_get_args_returns_new_objects():
+    """results are cached, but modifying a result does not affect later calls"""
+    args = utils.get_args(utils.show_tensor)
+    args["channel"] = 1
+    reqd_args = utils.get_reqd_args(utils.show_tensor)
+    reqd_args.append("channel")
+    assert utils.get_args(utils.show_tensor)["channel"] is None
+    assert utils.get_reqd_args(utils.show_tensor) == ["tensor"]
@@ -0,0 +1,44 @@
+import random
+
+from opensoundscape.ml.sampling import ClassAwareSampler, DistributedSamplerWrapper
+
+
+def test_distributed_sampler_wrapper():
+    labels = [0, 0, 1, 1, 1, 2, 2]
+
+    shards = []
+    for rank in range(2):
+        sampler = ClassAwareSampler(labels, num_samples_cls=2)
+        shards.append(list(DistributedSamplerWrapper(sampler, 2, rank)))
+
+    random.seed(0)  # the wrapper samples with seed + epoch = 0
+    full = list(ClassAwareSampler(labels, num_samples_cls=2))
+
+    assert shards[0] == full[0::2]
+    assert shards[1] == full[1::2]
+    assert len(DistributedSamplerWrapper(sampler, 2, 0)) == len(shards[0])
+    assert len(DistributedSamplerWrapper(sampler, 2, 1)) == len(shards[1])
+
+
+def test_distributed_sampler_wrapper_independent_of_global_random_state():
+    """ranks with different random states should get disjoint, covering shards"""
+    labels = [0, 0, 1, 1, 1, 2, 2, 2, 2, 3]
+
+    shards = []
+    for rank in range(2):
+        random.seed(rank)  # each process has a different global random state
+        sampler = ClassAwareSampler(labels, num_samples_cls=2)
+        wrapper = DistributedSamplerWrapper(sampler, 2, rank, seed=5)
+        wrapper.set_epoch(3)
+        shards.append(list(wrapper))
+        # the global random state is left as it was
+        random.seed(rank)
+        state = random.getstate()
+        list(DistributedSamplerWrapper(sampler, 2, rank))
+        assert random.getstate() == state
+
+    random.seed(5 + 3)
+    full = list(ClassAwareSampler(labels, num_samples_cls=2))
+    assert shards[0] == full[0::2]
+    assert shards[1] == full[1::2]
+    assert sorted(shards[0] + shards[1]) == sorted(full)
@@ -4,6 +4,7 @@ from opensoundscape.spectrogram import Spectrogram, MelSpectrogram
 import pytest
 import numpy as np
 import math
+import scipy.signal
 import torch
 from PIL.Image import Image
 
@@ -61,6 +62,48 @@ def test_spectrogram_shape_of_windowlengths_overlapfraction(veryshort_wav_str):
     assert spec.times.shape == (21,)
 
 
+@pytest.mark.parametrize("scaling", ["spectrum", "density"])
+@pytest.mark.parametrize("fft_size", [None, 1024])
+def test_spectrogram_matches_scipy(veryshort_wav_str, scaling, fft_size):
+    audio = Audio.from_file(veryshort_wav_str, sample_rate=22050)
+    spec = Spectrogram.from_audio(
+        audio, overlap_samples=384, fft_size=fft_size, scaling=scaling, dB_scale=False
+    )
+    frequencies, times, expected = scipy.signal.spectrogram(
+        audio.samples,
+        fs=audio.sample_rate,
+        window="hann",
+        nperseg=512,
+        noverlap=384,
+        nfft=fft_size,
+        scaling=scaling,
+    )
+    assert np.array_equal(spec.frequencies, frequencies)
+    assert np.array_equal(spec.times, times)
+    assert spec.spectrogram.dtype == expected.dtype
+    assert np.allclose(
+        spec.spectrogram, expected, rtol=1e-4, atol=1e-6 * expected.max()
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_spectrogram_dtype(veryshort_wav_str, dtype):
+    audio = Audio.from_file(veryshort_wav_str, sample_rate=22050)
+    assert Spectrogram.from_audio(audio, dtype=dtype).spectrogram.dtype == dtype
+    assert MelSpectrogram.from_audio(audio, dtype=dtype).spectrogram.dtype == dtype
+
+
+@pytest.mark.parametrize("spec_class", [Spectrogram, MelSpectrogram])
+def test_spectrogram_from_audio_batch(veryshort_wav_str, spec_class):
+    audio = Audio.from_file(veryshort_wav_str, sample_rate=22050)
+    audio_list = [audio, audio.apply_gain(-10), audio.trim(0, 0.1)]
+    specs = spec_class.from_audio_batch(audio_list, num_workers=2, overlap_samples=384)
+    for a, s in zip(audio_list, specs):
+        assert isinstance(s, spec_class)
+        expected = spec_class.from_audio(a, overlap_samples=384)
+        assert np.array_equal(s.spectrogram, expected.spectrogram)
+
+
 def test_construct_spectrogram_spectrogram_str_raises():
     with pytest.raises(TypeError):
         Spectrogram("raises", np.zeros((5)), np.zeros((10)), (-100, -20))
@@ -147,6 +190,17 @@ def test_trim_spectrogram(spec):
     assert spec.scaling == "spectrum"
 
 
+def test_trim_spectrogram_closest_times(spec):
+    # spec.times are 0, 1.11, 2.22, ... 10: keep columns closest to bounds
+    trimmed = spec.trim(1.5, 5.1)
+    assert np.array_equal(trimmed.times, spec.times[1:6])
+    # bounds outside of the spectrogram keep the first/last columns
+    assert np.array_equal(spec.trim(-5, 50).times, spec.times)
+    # ties go to the lower index, as with np.argmin
+    midpoint = (spec.times[2] + spec.times[3]) / 2
+    assert spec.trim(midpoint, 10).times[0] == spec.times[2]
+
+
 def test_limit_range():
     s = Spectrogram(
         np.random.normal(0, 200, [5, 10]), np.zeros((5)), np.zeros((10))
@@ -164,12 +218,44 @@ def test_amplitude_spectrogram():
     ).amplitude()
 
 
+def test_amplitude_freq_range_matches_bandpass(spec):
+    amplitude = spec.amplitude(freq_range=[1000, 5000])
+    expected = np.sum(spec.bandpass(1000, 5000).spectrogram, 0)
+    assert np.array_equal(amplitude, expected)
+
+
+def test_amplitude_out(spec):
+    out = np.empty(len(spec.times), dtype=spec.spectrogram.dtype)
+    amplitude = spec.amplitude(freq_range=[1000, 5000], out=out)
+    assert amplitude is out
+    assert np.array_equal(out, spec.amplitude(freq_range=[1000, 5000]))
+
+
 def test_net_amplitude_spectrogram():
     Spectrogram(
         np.zeros((5, 10)), np.linspace(0, 100, 5), np.linspace(0, 10, 10), (-100, -20)
     ).net_amplitude([50, 100], [[0, 10], [20, 30]])
 
 
+def test_net_amplitude_clips_negative_values(spec):
+    net_amplitude = spec.net_amplitude([1000, 2000], [[3000, 4000], [5000, 8000]])
+    assert isinstance(net_amplitude, np.ndarray)
+    assert net_amplitude.shape == (len(spec.times),)
+    assert net_amplitude.min() >= 0
+
+
+def test_spawn_keeps_class_and_attributes(veryshort_wav_str):
+    audio = Audio.from_file(veryshort_wav_str, sample_rate=22050)
+    mel_spec = MelSpectrogram.from_audio(audio)
+    trimmed = mel_spec.trim(0, 0.1)
+    assert type(trimmed) == MelSpectrogram
+    assert trimmed.spectrogram.shape == (len(trimmed.frequencies), len(trimmed.times))
+    for key in ("window_samples", "overlap_samples", "window_type", "scaling"):
+        assert getattr(trimmed, key) == getattr(mel_spec, key)
+    with pytest.raises(AttributeError):
+        trimmed.times = None
+
+
 def test_to_image():
     assert isinstance(
         Spectrogram(
@@ -217,6 +303,41 @@ def test_to_image_range(spec):
     assert img.min() >= 0 and img.max() <= 1
 
 
+def test_to_image_colormap(spec):
+    """colormap lookup table should give the same colors as matplotlib"""
+    import matplotlib
+    import skimage.transform
+    from opensoundscape.utils import linear_scale
+
+    img = spec.to_image(channels=3, colormap="jet", return_type="np")
+    array = linear_scale(spec.spectrogram, in_range=(-100, -20), out_range=(0, 1))
+    array = matplotlib.colormaps["jet"](np.clip(array, 0, 1)[::-1, :])
+    expected = skimage.transform.resize(array, list(spec.spectrogram.shape) + [3])
+    assert np.allclose(img, expected.transpose(2, 0, 1))
+
+
+def test_to_image_same_shape_matches_resize(spec):
+    """skipping the resize for an unchanged shape should not change the image"""
+    import skimage.transform
+
+    img = spec.to_image(shape=None, channels=3, return_type="np")
+    array = spec.to_image(shape=None, channels=1, return_type="np")[0]
+    expected = skimage.transform.resize(array, list(array.shape) + [3])
+    assert np.array_equal(img, expected.transpose(2, 0, 1))
+
+
+def test_to_image_greyscale_same_shape(spec):
+    """greyscale images at the original shape are rescaled, clipped and flipped"""
+    expected = np.clip((spec.spectrogram[::-1] + 100) / 80, 0, 1)
+    img = spec.to_image(return_type="np")
+    assert img.shape == (1,) + spec.spectrogram.shape
+    assert np.allclose(img[0], expected)
+    img = spec.to_image(invert=True, return_type="torch")
+    assert np.allclose(img[0].numpy(), 1 - expected)
+    img = spec.to_image(return_type="pil")
+    assert np.abs(np.array(img).astype(int) - np.uint8(expected * 255)).max() <= 1
+
+
 def test_to_image_shape_None(spec):
     """should retain original shape of spectrogram if shape=None"""
     img = spec.to_image(shape=None, channels=2, return_type="torch")
@@ -238,6 +359,17 @@ def test_melspectrogram_shape_of_S_for_veryshort(veryshort_wav_str):
     assert mel_spec.spectrogram.shape == (64, 11)
 
 
+def test_melspectrogram_reuses_filter_bank(veryshort_wav_str):
+    from opensoundscape.spectrogram import _mel_filter_bank
+
+    audio = Audio.from_file(veryshort_wav_str, sample_rate=22050)
+    _mel_filter_bank.cache_clear()
+    s1 = MelSpectrogram.from_audio(audio)
+    s2 = MelSpectrogram.from_audio(audio)
+    assert _mel_filter_bank.cache_info().hits == 1
+    assert np.array_equal(s1.spectrogram, s2.spectrogram)
+
+
 def test_melspectrogram_to_image_works(veryshort_wav_str):
     audio = Audio.from_file(veryshort_wav_str, sample_rate=22050)
     mel_spec = MelSpectrogram.from_audio(audio)